@@ -0,0 +1,140 @@
+"""
+Analysis Cache - content-addressed cache of agent contributions
+Keys hash the agent name, its version, the method and the normalized story fields
+that method reads, so identical inputs share one result and a version bump
+invalidates it.
+Memory is bounded with LRU eviction, an optional SQLite file adds a disk tier.
+Cached contributions are shared between callers and must be treated as read-only.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from .model_client import model_client
+
+
+def agent_inputs(agent, story_data, method_name=None):
+    """The normalized values of the story fields an agent method depends on"""
+    fields = getattr(agent, "method_input_fields", {}).get(method_name, agent.input_fields)
+    values = []
+    for field in fields:
+        value = story_data.get(field)
+        if field in agent.case_insensitive_fields and isinstance(value, str):
+            value = value.lower()
+        values.append(value)
+    return values
+
+
+def agent_cache_key(agent, story_data, method_name=None):
+    parts = [agent.agent_name, agent.version, method_name, agent_inputs(agent, story_data, method_name)]
+    if model_client is not None:
+        # Model-backed contributions differ from the mocked ones and between models
+        parts.append(model_client.model)
+    raw = json.dumps(parts)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, max_entries=None, disk_path=None):
+        self.max_entries = max_entries or int(os.environ.get("DREAMSCAPE_ANALYSIS_CACHE_SIZE", 10000))
+        self.disk_path = disk_path or os.environ.get("DREAMSCAPE_ANALYSIS_CACHE_DB")
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_path:
+            self._disk().executescript("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    agent TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    value TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_analysis_cache_agent ON analysis_cache (agent, version);
+            """)
+
+    def _disk(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.disk_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def retain_versions(self, versions):
+        """Drop disk entries written by other versions of the given agents {name: version}"""
+        if not self.disk_path:
+            return
+        for agent_name, version in versions.items():
+            self._disk().execute("DELETE FROM analysis_cache WHERE agent = ? AND version != ?",
+                                 (agent_name, version))
+
+    def _remember(self, key, value):
+        # Caller holds the lock
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        if self.disk_path:
+            row = self._disk().execute("SELECT value FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                value = json.loads(row[0])
+                with self._lock:
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value, agent=None):
+        with self._lock:
+            self._remember(key, value)
+        if self.disk_path and agent is not None:
+            self._disk().execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, agent, version, value) VALUES (?, ?, ?, ?)",
+                (key, agent.agent_name, agent.version, json.dumps(value))
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.disk_path:
+            self._disk().execute("DELETE FROM analysis_cache")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_tier": bool(self.disk_path)
+            }
+
+
+# Global instance
+analysis_cache = AnalysisCache()
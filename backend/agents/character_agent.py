@@ -2,8 +2,17 @@
 Character Agent - Handles character development, personalities, and relationships
 Mock version for Day 1 testing
 """
+from .model_client import model_client, prompt_for
 
 class CharacterAgent:
+    # Bump version whenever output changes, it invalidates cached analyses
+    version = "1.1"
+    # Story fields create_main_character depends on, both only used lower-cased
+    input_fields = ("genre", "idea")
+    case_insensitive_fields = ("genre", "idea")
+    # Other methods that read different fields
+    method_input_fields = {"suggest_supporting_cast": ()}
+    
     def __init__(self):
         self.agent_name = "CharacterAgent"
         self.specialty = "character development and relationships"
@@ -38,7 +47,7 @@ class CharacterAgent:
             "personality": ["relatable", "determined", "growing"]
         })
         
-        return {
+        result = {
             "agent": self.agent_name,
             "main_character": {
                 "name": "To be determined",
@@ -52,6 +61,12 @@ class CharacterAgent:
             },
             "development_notes": "Character should evolve significantly by story's end"
         }
+        
+        if model_client is not None:
+            prompt = prompt_for(self, "Describe the protagonist: their want, their need and the flaw "
+                                     "that stands between them.", story_data)
+            result["model_notes"] = model_client.complete(prompt)
+        return result
     
     def suggest_supporting_cast(self, story_data):
         """Suggest supporting characters"""
@@ -2,24 +2,212 @@
 Conference Manager - Coordinates multi-agent discussions
 Mock version for Day 1 testing
 """
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .analysis_cache import analysis_cache, agent_cache_key
+from .registry import agent_registry
+from utils.fork import after_fork
+from utils.metrics import metrics
+
+agent_call_seconds = metrics.histogram("dreamscape_agent_call_duration_seconds",
+                                       "Run time of each agent method call", ("agent", "method", "outcome"))
+agent_contributions = metrics.counter("dreamscape_agent_contributions_total",
+                                      "Contributions by how they were obtained", ("agent", "source"))
 
 class ConferenceManager:
-    def __init__(self):
+    def __init__(self, max_workers=None, agent_timeout=None, cache=None, registry=None, analysis_store=None,
+                 bulk_workers=None):
         self.manager_name = "ConferenceManager"
-        self.current_round = 0
+        self.cache = cache or analysis_cache
+        self.registry = registry or agent_registry
+        # Optional per-story store of fingerprinted contributions (review.analysis_store)
+        self.analysis_store = analysis_store
+        # Stateless across conferences, per-conference state lives in conference.session
         self.max_rounds = 3
+        # Agents of a round run side by side, each against its own deadline
+        self.max_workers = max_workers or int(os.environ.get("DREAMSCAPE_AGENT_WORKERS", 16))
+        # Batches run in a smaller pool of their own, so a large one never queues ahead of
+        # interactive conferences
+        self.bulk_workers = bulk_workers or int(os.environ.get("DREAMSCAPE_BULK_AGENT_WORKERS",
+                                                               max(1, self.max_workers // 4)))
+        self.agent_timeout = agent_timeout or float(os.environ.get("DREAMSCAPE_AGENT_TIMEOUT", 30))
+        self._executors = {}
+        self._executor_lock = threading.Lock()
+        after_fork(self._reset_after_fork)
+    
+    def warm_up(self):
+        """Load every registered agent and prune disk-cached contributions of older versions
+        
+        Call at boot so the first request pays no import or initialization cost
+        """
+        self.registry.warm_up()
+        self.cache.retain_versions(self.registry.versions())
+    
+    def _reset_after_fork(self):
+        self._executors = {}
+        self._executor_lock = threading.Lock()
+    
+    def _pool(self, bulk=False):
+        executor = self._executors.get(bulk)
+        if executor is None:
+            with self._executor_lock:
+                executor = self._executors.get(bulk)
+                if executor is None:
+                    executor = self._executors[bulk] = ThreadPoolExecutor(
+                        max_workers=self.bulk_workers if bulk else self.max_workers,
+                        thread_name_prefix="agent-bulk" if bulk else "agent")
+        return executor
+    
+    def _timed_call(self, agent, method, story_data):
+        """Run one agent method, timed through to the end even past its deadline"""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            contribution = method(story_data)
+            outcome = "ok"
+            return contribution
+        finally:
+            agent_call_seconds.observe(time.perf_counter() - started, agent.agent_name, method.__name__, outcome)
+    
+    def _compute(self, jobs, timeouts=None, on_result=None, bulk=False):
+        """Run {cache_key: (agent, method, story_data)} concurrently, each distinct key once
+        
+        Returns {cache_key: contribution}, degrading per agent on timeout or error.
+        on_result(cache_key, contribution) is called as each one becomes available.
+        bulk runs them in the batch pool instead of the interactive one.
+        """
+        timeouts = timeouts or {}
+        contributions = {}
+        pending = {}
+        started_at = {}
+        
+        def run(cache_key, agent, method, story_data):
+            # The deadline counts from here, time spent waiting for a pool thread is not the agent's
+            started_at[cache_key] = time.monotonic()
+            return self._timed_call(agent, method, story_data)
+        
+        def deadline(future, now):
+            cache_key, _, timeout = pending[future]
+            # One that has not started yet cannot expire before a full timeout from now
+            return started_at.get(cache_key, now) + timeout
+        
+        def resolve(cache_key, contribution):
+            contributions[cache_key] = contribution
+            if on_result is not None:
+                on_result(cache_key, contribution)
+        
+        for cache_key, (agent, method, story_data) in jobs.items():
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                agent_contributions.inc(agent.agent_name, "cache")
+                resolve(cache_key, cached)
+            else:
+                timeout = timeouts.get(agent.agent_name, self.agent_timeout)
+                future = self._pool(bulk).submit(run, cache_key, agent, method, story_data)
+                pending[future] = (cache_key, agent, timeout)
+        
+        # Collect in completion order so fast agents are reported without waiting on slow ones
+        while pending:
+            now = time.monotonic()
+            nearest = min(deadline(future, now) for future in pending)
+            done, _ = wait(pending, timeout=max(0.0, nearest - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                cache_key, agent, _ = pending.pop(future)
+                try:
+                    contribution = future.result()
+                    self.cache.put(cache_key, contribution, agent)
+                    agent_contributions.inc(agent.agent_name, "computed")
+                except Exception as e:
+                    contribution = {
+                        "agent": agent.agent_name,
+                        "status": "failed",
+                        "error": str(e)
+                    }
+                    agent_contributions.inc(agent.agent_name, "failed")
+                resolve(cache_key, contribution)
+            now = time.monotonic()
+            for future in [f for f in pending if deadline(f, now) <= now]:
+                cache_key, agent, timeout = pending.pop(future)
+                # The thread cannot be interrupted, its late result is simply dropped
+                future.cancel()
+                agent_contributions.inc(agent.agent_name, "timed_out")
+                resolve(cache_key, {
+                    "agent": agent.agent_name,
+                    "status": "timed_out",
+                    "timeout_seconds": timeout
+                })
+        return contributions
+    
+    def _run_agents(self, tasks, story_data, timeouts=None, on_contribution=None):
+        """Run {contribution: (agent, method)} for one story
+        
+        With an analysis store, contributions whose input fingerprint is unchanged
+        since they were saved for this story are reused instead of recomputed.
+        on_contribution(key, contribution) reports each one as soon as it is known.
+        """
+        keys = {key: agent_cache_key(agent, story_data, method.__name__) for key, (agent, method) in tasks.items()}
+        story_id = story_data.get("id")
+        saved = self.analysis_store.get(story_id) if self.analysis_store is not None and story_id else {}
+        reused = {key: saved[key]["value"] for key in tasks
+                  if key in saved and saved[key]["fingerprint"] == keys[key]}
+        for key in reused:
+            agent_contributions.inc(tasks[key][0].agent_name, "stored")
+        
+        if on_contribution is not None:
+            for key in reused:
+                on_contribution(key, reused[key])
+        
+        def forward(cache_key, contribution):
+            for key in tasks:
+                if keys[key] == cache_key and key not in reused:
+                    on_contribution(key, contribution)
+        
+        on_result = forward if on_contribution is not None else None
+        results = self._compute({
+            keys[key]: (agent, method, story_data) for key, (agent, method) in tasks.items() if key not in reused
+        }, timeouts, on_result)
+        
+        if story_id:
+            self._store(story_id, {key: (agent.agent_name, keys[key], results[keys[key]])
+                                   for key, (agent, _) in tasks.items() if key not in reused})
+        # Keep the contribution order stable regardless of cache hits
+        return {key: reused[key] if key in reused else results[keys[key]] for key in tasks}
+    
+    def _store(self, story_id, entries):
+        """Save {contribution: (agent_name, fingerprint, value)}, leaving out degraded ones"""
+        if self.analysis_store is not None:
+            self.analysis_store.save(story_id, {
+                key: entry for key, entry in entries.items()
+                if entry[2].get("status") not in ("timed_out", "failed")
+            })
+    
+    def stale_contributions(self, story_data):
+        """(stale, missing) contribution keys of a story
+        
+        Stale ones were saved from inputs that no longer match the story, missing ones
+        were never saved at all.
+        """
+        saved = self.analysis_store.get(story_data["id"]) if self.analysis_store is not None else {}
+        stale = []
+        missing = []
+        for round_number in range(1, self.max_rounds + 1):
+            for key, (agent, method) in self._round_tasks(round_number).items():
+                entry = saved.get(key)
+                if entry is None:
+                    missing.append(key)
+                elif entry["fingerprint"] != agent_cache_key(agent, story_data, method.__name__):
+                    stale.append(key)
+        return stale, missing
     
     def start_story_conference(self, story_data):
         """Initialize a multi-agent story development conference"""
-        from .plot_agent import plot_agent
-        from .character_agent import character_agent
-        from .dialogue_agent import dialogue_agent
-        
         return {
             "manager": self.manager_name,
             "story_id": story_data.get("id"),
             "conference_status": "initialized",
-            "participating_agents": ["PlotAgent", "CharacterAgent", "DialogueAgent"],
+            "participating_agents": self.registry.names(),
             "current_round": 0,
             "agenda": [
                 "Round 1: Initial story analysis and suggestions",
@@ -29,32 +217,113 @@ class ConferenceManager:
             "expected_outcome": "Comprehensive story development plan"
         }
     
-    def run_discussion_round(self, story_data, round_number=1):
-        """Run one round of agent discussion"""
-        from .plot_agent import plot_agent
-        from .character_agent import character_agent  
-        from .dialogue_agent import dialogue_agent
+    def _round_tasks(self, round_number):
+        """Contributions requested in each round of the agenda"""
+        if not 1 <= round_number <= self.max_rounds:
+            raise ValueError(f"Round must be between 1 and {self.max_rounds}")
+        return self.registry.round_tasks(round_number)
+    
+    def run_discussion_round(self, story_data, round_number=1, timeouts=None, previous_rounds=None,
+                             on_contribution=None):
+        """Run one round of agent discussion, agents answer concurrently
         
-        self.current_round = round_number
+        previous_rounds holds the results of the earlier rounds, which later rounds build on,
+        on_contribution(key, contribution) is called as each agent finishes
+        """
+        previous_rounds = previous_rounds or []
         
         # Get input from each agent
-        plot_input = plot_agent.analyze_story_idea(story_data)
-        character_input = character_agent.create_main_character(story_data)
-        dialogue_input = dialogue_agent.analyze_dialogue_style(story_data)
+        contributions = self._run_agents(self._round_tasks(round_number), story_data, timeouts,
+                                         on_contribution)
+        return self._round_result(round_number, contributions, previous_rounds)
+    
+    def _round_result(self, round_number, contributions, previous_rounds):
+        degraded = [c["agent"] for c in contributions.values() if c.get("status") in ("timed_out", "failed")]
+        
+        if round_number == 1:
+            synthesis = self._synthesize_inputs(contributions.get("plot_analysis", {}),
+                                                contributions.get("character_development", {}),
+                                                contributions.get("dialogue_style", {}))
+        elif round_number == 2:
+            synthesis = self._integrate_characters_and_plot(previous_rounds[0], contributions)
+        else:
+            synthesis = self._refine_dialogue(previous_rounds, contributions)
         
         return {
             "manager": self.manager_name,
             "round": round_number,
-            "status": "completed",
-            "agent_contributions": {
-                "plot_analysis": plot_input,
-                "character_development": character_input,
-                "dialogue_style": dialogue_input
-            },
-            "synthesis": self._synthesize_inputs(plot_input, character_input, dialogue_input),
-            "next_steps": "Ready for user review or next round"
+            "status": "partial" if degraded else "completed",
+            "degraded_agents": degraded,
+            "agent_contributions": contributions,
+            "synthesis": synthesis,
+            "next_steps": "Ready for user review or next round" if round_number < self.max_rounds
+                          else "Story development plan complete"
         }
     
+    def run_batch(self, stories, last_round=1, timeouts=None):
+        """Analyze many stories, computing each distinct agent input set only once
+        
+        Stories that agree on the fields an agent method reads share its contribution,
+        so the work scales with distinct inputs rather than story count.
+        Returns ({story_id: final round result}, stats).
+        """
+        last_round = min(last_round, self.max_rounds)
+        previous = {story["id"]: [] for story in stories}
+        requested = 0
+        computed = 0
+        for round_number in range(1, last_round + 1):
+            tasks = self._round_tasks(round_number)
+            # Group every (story, contribution) pair by its cache key
+            keys = {}
+            jobs = {}
+            for story in stories:
+                for key, (agent, method) in tasks.items():
+                    cache_key = agent_cache_key(agent, story, method.__name__)
+                    keys[story["id"], key] = cache_key
+                    jobs.setdefault(cache_key, (agent, method, story))
+            requested += len(keys)
+            computed += len(jobs)
+            
+            results = self._compute(jobs, timeouts, bulk=True)
+            for story in stories:
+                contributions = {key: results[keys[story["id"], key]] for key in tasks}
+                self._store(story["id"], {key: (agent.agent_name, keys[story["id"], key], contributions[key])
+                                          for key, (agent, _) in tasks.items()})
+                previous[story["id"]].append(
+                    self._round_result(round_number, contributions, previous[story["id"]]))
+        
+        return {story_id: rounds[-1] for story_id, rounds in previous.items()}, {
+            "stories": len(stories),
+            "rounds": last_round,
+            "contributions": requested,
+            "distinct_inputs": computed
+        }
+    
+    def run_conference(self, story_data, first_round=1, last_round=None, timeouts=None, conference=None):
+        """Generator of round results, each round feeding the next
+        
+        Rounds before first_round are taken from the conference state when one is
+        given, otherwise replayed from the analysis cache, and are not yielded,
+        which lets a client resume after the last round it received. New rounds are
+        recorded on the conference. Closing the generator stops the conference
+        before the remaining rounds start.
+        """
+        last_round = min(last_round or self.max_rounds, self.max_rounds)
+        if not 1 <= first_round <= last_round:
+            raise ValueError(f"Rounds must satisfy 1 <= first_round <= last_round <= {self.max_rounds}")
+        
+        rounds = []
+        for round_number in range(1, last_round + 1):
+            if conference is not None and round_number <= conference.current_round:
+                result = conference.rounds[round_number - 1]
+            else:
+                result = self.run_discussion_round(story_data, round_number, timeouts, rounds)
+                if conference is not None:
+                    conference.record(result)
+            rounds.append(result)
+            if round_number >= first_round:
+                yield result
+    
     def _synthesize_inputs(self, plot_input, character_input, dialogue_input):
         """Combine agent inputs into coherent recommendations"""
         return {
@@ -67,6 +336,45 @@ class ConferenceManager:
                 "All elements should support the chosen genre and mood"
             ]
         }
+    
+    def _integrate_characters_and_plot(self, first_round, contributions):
+        """Round 2: fit the supporting cast and twist around the round 1 plan"""
+        earlier = first_round["synthesis"]
+        twist = contributions.get("plot_twist", {})
+        return {
+            "main_character": earlier["main_character"],
+            "supporting_cast": contributions.get("supporting_cast", {}).get("supporting_characters", []),
+            "story_structure": earlier["story_structure"],
+            "plot_twist": {
+                "twist": twist.get("suggested_twist"),
+                "timing": twist.get("timing"),
+                "impact": twist.get("impact")
+            },
+            "integration_notes": [
+                f"The twist should test {earlier['main_character'].get('archetype', 'the protagonist')} "
+                "at their weakest point",
+                "Give each supporting character a stake in the twist",
+                "Foreshadow the twist during the rising action"
+            ]
+        }
+    
+    def _refine_dialogue(self, previous_rounds, contributions):
+        """Round 3: final plan combining every round"""
+        integration = previous_rounds[1]["synthesis"]
+        sample = contributions.get("sample_dialogue", {})
+        return {
+            "main_character": integration["main_character"],
+            "supporting_cast": integration["supporting_cast"],
+            "story_structure": integration["story_structure"],
+            "plot_twist": integration["plot_twist"],
+            "dialogue_approach": previous_rounds[0]["synthesis"]["dialogue_approach"],
+            "sample_dialogue": sample.get("dialogue", []),
+            "refinements": [
+                "Give each supporting character a distinct voice",
+                "Let the protagonist's dialogue change as their arc progresses",
+                "Seed dialogue hints before the plot twist"
+            ]
+        }
 
 # Global instance
 conference_manager = ConferenceManager()
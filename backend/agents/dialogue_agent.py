@@ -2,8 +2,17 @@
 Dialogue Agent - Handles dialogue, voice, and character interactions
 Mock version for Day 1 testing
 """
+from .model_client import model_client, prompt_for
 
 class DialogueAgent:
+    # Bump version whenever output changes, it invalidates cached analyses
+    version = "1.1"
+    # Story fields analyze_dialogue_style depends on, both only used lower-cased
+    input_fields = ("genre", "mood")
+    case_insensitive_fields = ("genre", "mood")
+    # Other methods that read different fields
+    method_input_fields = {"create_sample_dialogue": ("title",)}
+    
     def __init__(self):
         self.agent_name = "DialogueAgent"
         self.specialty = "dialogue and character voice"
@@ -44,7 +53,7 @@ class DialogueAgent:
         
         style = style_guide.get(genre, default_style)
         
-        return {
+        result = {
             "agent": self.agent_name,
             "dialogue_style": style,
             "guidelines": [
@@ -55,6 +64,11 @@ class DialogueAgent:
             ],
             "mood_adjustments": self._adjust_for_mood(mood)
         }
+        
+        if model_client is not None:
+            prompt = prompt_for(self, "Describe how characters in this story should speak.", story_data)
+            result["model_notes"] = model_client.complete(prompt)
+        return result
     
     def create_sample_dialogue(self, story_data):
         """Create sample dialogue based on the story"""
@@ -0,0 +1,171 @@
+"""
+Model Client - shared HTTP client for model-backed agents
+One pooled session per process, concurrent prompts coalesced into batch requests,
+retries with jittered exponential backoff and streamed token responses.
+Enabled by setting DREAMSCAPE_MODEL_URL, e.g. to the local stub in agents.model_stub.
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from utils.fork import after_fork
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # only needed once a model server is configured
+    requests = None
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class ModelUnavailable(Exception):
+    """Raised when the model server cannot be reached after all retries"""
+
+
+class ModelClient:
+    def __init__(self, base_url, model=None, timeout=None, max_batch=None, batch_window=None,
+                 retries=None, backoff=None, pool_size=None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model or os.environ.get("DREAMSCAPE_MODEL_NAME", "stub")
+        self.timeout = timeout or float(os.environ.get("DREAMSCAPE_MODEL_TIMEOUT", 20))
+        # Prompts arriving within batch_window seconds share one request, 1 disables batching
+        self.max_batch = max_batch or int(os.environ.get("DREAMSCAPE_MODEL_MAX_BATCH", 16))
+        self.batch_window = batch_window if batch_window is not None else \
+            float(os.environ.get("DREAMSCAPE_MODEL_BATCH_WINDOW_MS", 5)) / 1000
+        self.retries = retries if retries is not None else int(os.environ.get("DREAMSCAPE_MODEL_RETRIES", 3))
+        self.backoff = backoff or float(os.environ.get("DREAMSCAPE_MODEL_BACKOFF", 0.2))
+        self.pool_size = pool_size or int(os.environ.get("DREAMSCAPE_MODEL_POOL", 16))
+        self._setup()
+        after_fork(self._setup)
+
+    def _setup(self):
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._queue = []
+        self._cond = threading.Condition()
+        self._batcher = None
+        self._senders = None
+        self.requests_sent = 0
+        self.prompts_sent = 0
+        self.retried = 0
+
+    def _post(self, path, payload, stream=False):
+        """POST with retries on connection errors and retryable statuses"""
+        url = self.base_url + path
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._session.post(url, json=payload, timeout=self.timeout, stream=stream)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    self.requests_sent += 1
+                    return response
+                error = f"HTTP {response.status_code}"
+                response.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            if attempt < self.retries:
+                self.retried += 1
+                # Full jitter keeps retrying clients from hitting the server in lockstep
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        raise ModelUnavailable(f"Model request to {path} failed after {self.retries + 1} attempts: {error}")
+
+    def complete(self, prompt, max_tokens=256):
+        """Completion text for one prompt, batched with concurrent callers"""
+        if self.max_batch <= 1:
+            self.prompts_sent += 1
+            payload = {"model": self.model, "prompt": prompt, "max_tokens": max_tokens}
+            return self._post("/v1/complete", payload).json()["completion"]
+
+        future = Future()
+        with self._cond:
+            if self._batcher is None:
+                self._senders = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="model-send")
+                self._batcher = threading.Thread(target=self._collect, name="model-batcher", daemon=True)
+                self._batcher.start()
+            self._queue.append(({"prompt": prompt, "max_tokens": max_tokens}, future))
+            self._cond.notify()
+        # Bounded by the worst case of every retry timing out plus its backoff
+        return future.result(timeout=(self.timeout + self.backoff * 2 ** self.retries) * (self.retries + 1)
+                             + self.batch_window)
+
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.batch_window
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+            self._senders.submit(self._send_batch, batch)
+
+    def _send_batch(self, batch):
+        try:
+            response = self._post("/v1/batch", {
+                "model": self.model,
+                "requests": [item for item, _ in batch]
+            })
+            completions = response.json()["completions"]
+            self.prompts_sent += len(batch)
+            for (_, future), completion in zip(batch, completions):
+                future.set_result(completion)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def stream(self, prompt, max_tokens=256):
+        """Yield completion tokens as the server produces them"""
+        self.prompts_sent += 1
+        payload = {"model": self.model, "prompt": prompt, "max_tokens": max_tokens, "stream": True}
+        with self._post("/v1/complete", payload, stream=True) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("done"):
+                    return
+                yield chunk["token"]
+
+    def stats(self):
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "requests": self.requests_sent,
+            "prompts": self.prompts_sent,
+            "retries": self.retried,
+            "queued": len(self._queue),
+            "max_batch": self.max_batch
+        }
+
+
+def create_model_client():
+    """The shared client when DREAMSCAPE_MODEL_URL is set, otherwise None (agents stay mocked)"""
+    base_url = os.environ.get("DREAMSCAPE_MODEL_URL")
+    if not base_url:
+        return None
+    if requests is None:
+        raise RuntimeError("DREAMSCAPE_MODEL_URL is set but the requests package is not installed")
+    return ModelClient(base_url)
+
+
+def prompt_for(agent, task, story_data):
+    """A prompt built only from the normalized fields the agent declares, so cache keys stay correct"""
+    from .analysis_cache import agent_inputs
+    
+    values = agent_inputs(agent, story_data)
+    fields = "\n".join(f"{field}: {value or ''}" for field, value in zip(agent.input_fields, values))
+    return f"You are {agent.agent_name}, an expert in {agent.specialty}.\n{task}\n\n{fields}"
+
+
+# Global instance
+model_client = create_model_client()
@@ -0,0 +1,143 @@
+"""
+Model Stub - local stand-in for a model server, for offline throughput and latency tests
+Serves canned completions with configurable latency, jitter and failure rate:
+
+    python -m agents.model_stub --port 8765 --latency-ms 80 --jitter-ms 40
+    DREAMSCAPE_MODEL_URL=http://127.0.0.1:8765 python app.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_COMPLETIONS = [
+    "Open on a quiet moment that the central conflict is about to shatter.",
+    "Let the protagonist's flaw cause the midpoint reversal rather than bad luck.",
+    "Give the antagonist a goal the audience could sympathise with.",
+    "Tie the climax back to an image planted in the first scene.",
+    "Keep every supporting character's dialogue in their own rhythm."
+]
+
+
+def canned_completion(prompt, max_tokens):
+    """Deterministic per prompt, so repeated prompts get repeated answers"""
+    index = int(hashlib.sha256(prompt.encode()).hexdigest(), 16) % len(CANNED_COMPLETIONS)
+    return " ".join(CANNED_COMPLETIONS[index].split()[:max_tokens])
+
+
+class StubConfig:
+    def __init__(self, latency_ms=50, jitter_ms=20, per_prompt_ms=5, token_ms=10, failure_rate=0.0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.per_prompt = per_prompt_ms / 1000
+        self.token_interval = token_ms / 1000
+        self.failure_rate = failure_rate
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompts = 0
+
+
+def make_handler(config):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _simulate(self, prompts):
+            with config.lock:
+                config.requests += 1
+                config.prompts += prompts
+            # One fixed cost per request plus a small cost per prompt, as batching servers behave
+            time.sleep(config.latency + random.uniform(0, config.jitter) + config.per_prompt * prompts)
+            return random.random() >= config.failure_rate
+
+        def do_GET(self):
+            if self.path == "/health":
+                with config.lock:
+                    self._send_json(200, {"status": "ok", "requests": config.requests, "prompts": config.prompts})
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send_json(400, {"error": "Invalid JSON"})
+                return
+
+            if self.path == "/v1/complete":
+                if not self._simulate(1):
+                    self._send_json(503, {"error": "Simulated overload"})
+                    return
+                completion = canned_completion(body.get("prompt", ""), body.get("max_tokens", 256))
+                if body.get("stream"):
+                    self._stream(completion)
+                else:
+                    self._send_json(200, {"completion": completion})
+            elif self.path == "/v1/batch":
+                items = body.get("requests", [])
+                if not self._simulate(len(items)):
+                    self._send_json(503, {"error": "Simulated overload"})
+                    return
+                self._send_json(200, {"completions": [
+                    canned_completion(item.get("prompt", ""), item.get("max_tokens", 256)) for item in items
+                ]})
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def _stream(self, completion):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for index, token in enumerate(completion.split()):
+                time.sleep(config.token_interval)
+                self._write_chunk(json.dumps({"token": token if index == 0 else " " + token}) + "\n")
+            self._write_chunk(json.dumps({"done": True}) + "\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_chunk(self, text):
+            data = text.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return StubHandler
+
+
+def serve(host="127.0.0.1", port=8765, config=None):
+    """Start the stub in a background thread and return the server (call shutdown() to stop)"""
+    server = ThreadingHTTPServer((host, port), make_handler(config or StubConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="model-stub", daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local stub model server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--per-prompt-ms", type=float, default=5)
+    parser.add_argument("--token-ms", type=float, default=10)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.per_prompt_ms, args.token_ms, args.failure_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+    print(f"🤖 Stub model server on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -2,8 +2,17 @@
 Plot Agent - Handles story structure, plot development, and narrative flow
 This is a stub/mock version for Day 1 - will be enhanced with real AI later
 """
+from .model_client import model_client, prompt_for
 
 class PlotAgent:
+    # Bump version whenever output changes, it invalidates cached analyses
+    version = "1.1"
+    # Story fields analyze_story_idea depends on (title and genre appear verbatim)
+    input_fields = ("title", "genre")
+    case_insensitive_fields = ()
+    # Other methods that read different fields
+    method_input_fields = {"suggest_plot_twist": ("genre",)}
+    
     def __init__(self):
         self.agent_name = "PlotAgent"
         self.specialty = "story structure and plot development"
@@ -14,7 +23,7 @@ class PlotAgent:
         genre = story_data.get("genre", "Unknown")
         idea = story_data.get("idea", "")
         
-        return {
+        result = {
             "agent": self.agent_name,
             "analysis": f"For '{title}' in the {genre} genre, I suggest a three-act structure.",
             "plot_suggestions": [
@@ -26,6 +35,12 @@ class PlotAgent:
             "pacing_notes": "Consider building tension gradually in the first half",
             "confidence": 0.85
         }
+        
+        if model_client is not None:
+            prompt = prompt_for(self, "Suggest a plot structure and the key dramatic beats "
+                                     "for this story.", story_data)
+            result["model_notes"] = model_client.complete(prompt)
+        return result
     
     def suggest_plot_twist(self, story_data):
         """Suggest potential plot twists"""
@@ -0,0 +1,86 @@
+"""
+Agent Registry - the agents taking part in story conferences
+Each agent is registered with the module holding its instance and the contributions
+it makes in each round. Modules are imported once, on first use or at warm-up, and
+the agent classes declare their own name, version and input fields.
+"""
+import importlib
+import threading
+
+
+class AgentSpec:
+    def __init__(self, name, module, attribute, contributions):
+        self.name = name
+        self.module = module
+        self.attribute = attribute
+        # {round_number: {contribution_key: method_name}}
+        self.contributions = contributions
+
+
+class AgentRegistry:
+    def __init__(self):
+        self._specs = {}
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, module, attribute, contributions):
+        """Add an agent, module is imported relative to this package when given as '.name'"""
+        with self._lock:
+            self._specs[name] = AgentSpec(name, module, attribute, contributions)
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        agent = self._instances.get(name)
+        if agent is None:
+            with self._lock:
+                agent = self._instances.get(name)
+                if agent is None:
+                    spec = self._specs[name]
+                    module = importlib.import_module(spec.module, package=__package__)
+                    agent = getattr(module, spec.attribute)
+                    self._instances[name] = agent
+        return agent
+
+    def names(self):
+        return list(self._specs)
+
+    def agents(self):
+        return [self.get(name) for name in self._specs]
+
+    def versions(self):
+        return {agent.agent_name: agent.version for agent in self.agents()}
+
+    def max_round(self):
+        return max((max(spec.contributions, default=0) for spec in self._specs.values()), default=0)
+
+    def round_tasks(self, round_number):
+        """{contribution_key: (agent, bound method)} for one round, in registration order"""
+        tasks = {}
+        for name, spec in self._specs.items():
+            methods = spec.contributions.get(round_number, {})
+            if methods:
+                agent = self.get(name)
+                for key, method_name in methods.items():
+                    tasks[key] = (agent, getattr(agent, method_name))
+        return tasks
+
+    def warm_up(self):
+        """Import and instantiate every agent now instead of on the first request"""
+        return self.agents()
+
+
+# Global instance
+agent_registry = AgentRegistry()
+
+agent_registry.register("PlotAgent", ".plot_agent", "plot_agent", {
+    1: {"plot_analysis": "analyze_story_idea"},
+    2: {"plot_twist": "suggest_plot_twist"}
+})
+agent_registry.register("CharacterAgent", ".character_agent", "character_agent", {
+    1: {"character_development": "create_main_character"},
+    2: {"supporting_cast": "suggest_supporting_cast"}
+})
+agent_registry.register("DialogueAgent", ".dialogue_agent", "dialogue_agent", {
+    1: {"dialogue_style": "analyze_dialogue_style"},
+    3: {"sample_dialogue": "create_sample_dialogue"}
+})
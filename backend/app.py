@@ -2,17 +2,147 @@
 DreamScape Flask Backend Application with Authentication
 """
 import os
+import hmac
 import json
 import uuid
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from auth.user_manager import user_manager
+from utils.storage import DATA_DIR, storage, story_store
+from utils.transfer import export_ndjson, import_stories, import_users
+from utils.http_cache import etag_for, install as install_http_cache, not_modified
+from utils.metrics import STORAGE_BUCKETS, install as install_metrics, metrics, time_methods
+from agents.analysis_cache import analysis_cache
+from agents.conference_manager import conference_manager
+from conference.jobs import JobQueue, JobStore, QueueFull, TERMINAL_STATUSES
+from conference.scheduler import BULK, INTERACTIVE, SchedulerBusy, conference_scheduler
+from conference.session import conference_store
+from review.analysis_store import AnalysisStore
 
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'dreamscape-secret-key-2025'
-CORS(app)
+CORS(app, expose_headers=["ETag"])
+# Metrics first, so request timings include the caching and compression hook
+install_metrics(app)
+install_http_cache(app)
+
+# Latest contributions per story, so re-analysis after an edit only reruns changed agents
+analysis_store = AnalysisStore(os.environ.get("DREAMSCAPE_ANALYSIS_DB", os.path.join(DATA_DIR, "analysis.db")))
+conference_manager.analysis_store = analysis_store
+
+# Time every storage read and write, per engine and method
+TIMED_STORAGE_METHODS = (
+    "get_user", "add_user", "update_user", "get_username_by_email", "iter_users",
+    "get_session", "add_session", "update_session", "touch_sessions", "delete_session", "delete_expired_sessions",
+    "get_story", "get_stories", "add_story", "add_stories", "update_story", "iter_stories", "list_user_stories",
+    "get", "save", "delete"
+)
+storage_seconds = metrics.histogram("dreamscape_storage_operation_duration_seconds",
+                                    "Run time of storage reads and writes", ("engine", "method"), STORAGE_BUCKETS)
+storage_errors = metrics.counter("dreamscape_storage_errors_total",
+                                 "Storage calls that raised", ("engine", "method"))
+for timed_store in {id(store): store for store in (storage, story_store, analysis_store)}.values():
+    time_methods(timed_store, TIMED_STORAGE_METHODS, storage_seconds, storage_errors, type(timed_store).__name__)
+
+# Load the agents now rather than inside the first analyze request
+if os.environ.get("DREAMSCAPE_AGENT_WARMUP", "1") != "0":
+    conference_manager.warm_up()
+
+def run_analysis_job(job, report_progress):
+    """Background job body: run the agent conference for one story"""
+    story_data = story_store.get_story(job["story_id"])
+    if story_data is None:
+        raise ValueError("Story not found")
+    
+    tasks = conference_manager.registry.round_tasks(1)
+    progress = {"completed": 0, "total": len(tasks), "agent_contributions": {}}
+    
+    def on_contribution(key, contribution):
+        # Published as each agent finishes so pollers can render partial results
+        progress["agent_contributions"][key] = contribution
+        progress["completed"] = len(progress["agent_contributions"])
+        report_progress(progress)
+    
+    # Jobs already wait in their own queue, so give them longer to get a slot. updated_at does not
+    # move while waiting, so stay well inside stale_after or another process would requeue the job
+    with conference_scheduler.slot(job["owner"] or "", INTERACTIVE,
+                                   timeout=analysis_jobs.stale_after / 2):
+        return conference_manager.run_discussion_round(story_data, 1, on_contribution=on_contribution)
+
+analysis_jobs = JobQueue(
+    run_analysis_job,
+    JobStore(os.environ.get("DREAMSCAPE_JOBS_DB", os.path.join(DATA_DIR, "jobs.db"))),
+    # Never claim more of one caller's jobs than the scheduler would let run
+    per_owner=conference_scheduler.per_user,
+    per_owner_queued=conference_scheduler.per_user_queue
+)
+
+# Background threads start with the first request, so they run only in serving processes
+# and never in a preloading gunicorn master (see utils.fork)
+@app.before_request
+def start_background_workers():
+    user_manager.sessions.start()
+    analysis_jobs.start()
+
+def runtime_gauges():
+    """Current state of the pools and queues, read at scrape time"""
+    scheduler = conference_scheduler.stats()
+    yield ("dreamscape_scheduler_running", "gauge", "Conference slots in use, per lane",
+           [({"lane": lane}, count) for lane, count in scheduler["running"].items()])
+    yield ("dreamscape_scheduler_waiting", "gauge", "Requests waiting for a conference slot, per lane",
+           [({"lane": lane}, count) for lane, count in scheduler["waiting"].items()])
+    yield ("dreamscape_scheduler_rejected_total", "counter", "Requests refused a conference slot",
+           [({}, scheduler["rejected"])])
+    yield ("dreamscape_jobs_queued", "gauge", "Analysis jobs waiting for a worker",
+           [({}, analysis_jobs.stats()["queued"])])
+    hash_pool = user_manager.hasher.metrics()
+    yield ("dreamscape_hash_pool_active", "gauge", "Password hashes being computed", [({}, hash_pool["active"])])
+    yield ("dreamscape_hash_pool_queued", "gauge", "Password hashes waiting", [({}, hash_pool["queued"])])
+    cache = analysis_cache.stats()
+    yield ("dreamscape_analysis_cache_lookups_total", "counter", "Analysis cache lookups by result",
+           [({"result": "hit"}, cache["hits"]), ({"result": "disk_hit"}, cache["disk_hits"]),
+            ({"result": "miss"}, cache["misses"])])
+    yield ("dreamscape_analysis_cache_entries", "gauge", "Contributions held in memory", [({}, cache["entries"])])
+    yield ("dreamscape_conferences", "gauge", "Multi-round conferences held in memory",
+           [({}, conference_store.stats()["conferences"])])
+
+metrics.register_collector(runtime_gauges)
+
+def admin_authorized():
+    """Admin endpoints are disabled unless DREAMSCAPE_ADMIN_TOKEN is set and matches"""
+    token = os.environ.get('DREAMSCAPE_ADMIN_TOKEN')
+    provided = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(provided, token)
+
+def scheduler_user(data):
+    """Who conference work is charged to: the caller, never the story's owner
+
+    The session's user when a valid session_id is supplied, then the client named in the
+    DREAMSCAPE_CLIENT_HEADER header (only set it when every request comes through a frontend
+    or proxy that fills it in, such as X-DreamScape-Client from the Streamlit app),
+    otherwise the client address
+    """
+    session_id = (data or {}).get('session_id')
+    if session_id:
+        session = user_manager.validate_session(session_id)
+        if session["valid"]:
+            return f"user:{session['username']}"
+    header = os.environ.get('DREAMSCAPE_CLIENT_HEADER')
+    client = request.headers.get(header, '') if header else ''
+    if client:
+        return f"client:{client}"
+    return f"addr:{request.remote_addr or ''}"
+
+def public_job(job):
+    """A job as clients see it, without who it is charged to"""
+    return {key: value for key, value in job.items() if key != "owner"}
+
+def scheduler_busy_response(error):
+    response = jsonify({"success": False, "error": str(error)})
+    response.headers["Retry-After"] = "5"
+    return response, 503
 
 @app.route('/')
 def home():
@@ -34,7 +164,10 @@ def api_status():
             "POST /api/auth/login", 
             "POST /api/auth/logout",
             "POST /api/auth/validate",
-            "GET /api/user/<username>"
+            "GET /api/auth/hash-pool",
+            "GET /api/user/<username>",
+            "GET /api/user/<username>/stories?limit=&after=&genre=&status=",
+            "GET /api/users/by-email?email=<email> (admin)"
         ]
     })
 
@@ -52,6 +185,8 @@ def register():
         
         if result["success"]:
             return jsonify(result), 201
+        elif result.get("busy"):
+            return jsonify(result), 503
         else:
             return jsonify(result), 400
             
@@ -73,6 +208,8 @@ def login():
         
         if result["success"]:
             return jsonify(result), 200
+        elif result.get("busy"):
+            return jsonify(result), 503
         else:
             return jsonify(result), 401
             
@@ -119,6 +256,10 @@ def logout():
             "error": f"Logout error: {str(e)}"
         }), 500
 
+@app.route('/api/auth/hash-pool')
+def hash_pool_metrics():
+    return jsonify(user_manager.hasher.metrics())
+
 @app.route('/api/user/<username>')
 def get_user_data(username):
     try:
@@ -135,6 +276,62 @@ def get_user_data(username):
             "error": f"Error getting user data: {str(e)}"
         }), 500
 
+@app.route('/api/user/<username>/stories')
+def list_user_stories(username):
+    """Cursor-paginated listing of a user's stories, newest first"""
+    try:
+        try:
+            limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        except ValueError:
+            return jsonify({"success": False, "error": "limit must be an integer"}), 400
+        
+        stories, next_cursor = story_store.list_user_stories(
+            username,
+            limit=limit,
+            after=request.args.get('after') or None,
+            genre=request.args.get('genre') or None,
+            status=request.args.get('status') or None
+        )
+        
+        return jsonify({
+            "success": True,
+            "username": username,
+            "stories": stories,
+            "next_cursor": next_cursor
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error listing stories: {str(e)}"
+        }), 500
+
+@app.route('/api/users/by-email')
+def find_user_by_email():
+    # Maps emails to usernames, so it must not be open to account enumeration
+    if not admin_authorized():
+        return jsonify({"success": False, "error": "Admin token required"}), 403
+    
+    try:
+        email = request.args.get('email', '').strip()
+        
+        result = user_manager.find_user_by_email(email)
+        
+        if result["success"]:
+            return jsonify(result), 200
+        elif not email:
+            return jsonify(result), 400
+        else:
+            return jsonify(result), 404
+            
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error looking up email: {str(e)}"
+        }), 500
+
 @app.route('/api/test')
 def test_endpoint():
     return jsonify({
@@ -143,9 +340,15 @@ def test_endpoint():
         "timestamp": "2025-09-10",
         "authentication": "enabled"
     })
-@app.route('/api/story/create', methods=['POST'])
-def create_story():
-    data = request.get_json()
+
+# Story endpoints
+MAX_STORY_BATCH = 1000
+
+def build_story(data):
+    """Validate a story payload and build the stored record, returns (story, error)"""
+    if not isinstance(data, dict):
+        return None, "Story must be a JSON object"
+
     title = data.get('title')
     genre = data.get('genre')
     mood = data.get('mood')
@@ -153,19 +356,10 @@ def create_story():
     username = data.get('username')
 
     if not (title and genre and mood and idea and username):
-        return jsonify({"success": False, "error": "Missing fields"}), 400
+        return None, "Missing fields"
 
-    stories_file = "data/stories.json"
-    try:
-        with open(stories_file, 'r') as f:
-            stories = json.load(f)
-    except Exception:
-        stories = {}
-
-    story_id = str(uuid.uuid4())
-
-    new_story = {
-        "id": story_id,
+    return {
+        "id": str(uuid.uuid4()),
         "title": title,
         "genre": genre,
         "mood": mood,
@@ -173,13 +367,125 @@ def create_story():
         "created_at": datetime.now().isoformat(),
         "username": username,
         "status": "in_progress"
-    }
+    }, None
 
-    stories[story_id] = new_story
-    with open(stories_file, 'w') as f:
-        json.dump(stories, f, indent=2)
+@app.route('/api/story/create', methods=['POST'])
+def create_story():
+    data = request.get_json()
+    new_story, error = build_story(data)
+
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    story_store.add_story(new_story)
+
+    return jsonify({"success": True, "story_id": new_story["id"], "story": new_story})
+
+EDITABLE_STORY_FIELDS = ("title", "genre", "mood", "idea", "status")
+
+@app.route('/api/story/<story_id>', methods=['PATCH'])
+def update_story(story_id):
+    """Edit story fields, reporting which agent contributions the edit makes stale"""
+    try:
+        data = request.get_json()
+        
+        if not isinstance(data, dict) or not data:
+            return jsonify({"success": False, "error": "Fields to update are required"}), 400
+        
+        unknown = [field for field in data if field not in EDITABLE_STORY_FIELDS]
+        if unknown:
+            return jsonify({"success": False, "error": f"Fields cannot be edited: {', '.join(unknown)}"}), 400
+        
+        if not all(isinstance(value, str) and value.strip() for value in data.values()):
+            return jsonify({"success": False, "error": "Fields must be non-empty strings"}), 400
+        
+        story = story_store.update_story(story_id, data)
+        if story is None:
+            return jsonify({"success": False, "error": "Story not found"}), 404
+        
+        stale, missing = conference_manager.stale_contributions(story)
+        return jsonify({
+            "success": True,
+            "story": story,
+            "stale_contributions": stale,
+            "missing_contributions": missing
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Story update failed: {str(e)}"
+        }), 500
 
-    return jsonify({"success": True, "story_id": story_id, "story": new_story})
+@app.route('/api/story/<story_id>/analysis')
+def get_story_analysis(story_id):
+    """Saved agent contributions of a story and whether each is still current"""
+    story_data = story_store.get_story(story_id)
+    
+    if story_data is None:
+        return jsonify({"success": False, "error": "Story not found"}), 404
+    
+    contributions = analysis_store.get(story_id)
+    # Versioned by the story content and every saved contribution
+    etag = etag_for("analysis", story_data, sorted(
+        (key, entry["fingerprint"], entry["updated_at"]) for key, entry in contributions.items()))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    stale, missing = conference_manager.stale_contributions(story_data)
+    response = jsonify({
+        "success": True,
+        "story_id": story_id,
+        "contributions": contributions,
+        "stale_contributions": stale,
+        "missing_contributions": missing
+    })
+    response.set_etag(etag)
+    return response, 200
+
+@app.route('/api/story/batch', methods=['POST'])
+def create_story_batch():
+    """Create many stories with a single storage write"""
+    try:
+        data = request.get_json()
+        payloads = data.get('stories') if isinstance(data, dict) else data
+        
+        if not isinstance(payloads, list) or not payloads:
+            return jsonify({"success": False, "error": "A non-empty list of stories is required"}), 400
+        
+        if len(payloads) > MAX_STORY_BATCH:
+            return jsonify({
+                "success": False,
+                "error": f"At most {MAX_STORY_BATCH} stories per batch"
+            }), 413
+        
+        results = []
+        valid = []
+        for index, payload in enumerate(payloads):
+            story, error = build_story(payload)
+            if error:
+                results.append({"index": index, "success": False, "error": error})
+            else:
+                results.append({"index": index, "success": True, "story_id": story["id"]})
+                valid.append(story)
+        
+        # One transaction (or one journal append) for the whole batch
+        if valid:
+            story_store.add_stories(valid)
+        
+        return jsonify({
+            "success": bool(valid),
+            "created": len(valid),
+            "failed": len(payloads) - len(valid),
+            "results": results
+        }), 201 if valid else 400
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Batch creation failed: {str(e)}"
+        }), 500
 
 @app.route('/api/story/analyze', methods=['POST'])
 def analyze_story():
@@ -192,19 +498,17 @@ def analyze_story():
             return jsonify({"success": False, "error": "Story ID required"}), 400
         
         # Load the story
-        with open('data/stories.json', 'r') as f:
-            stories = json.load(f)
+        story_data = story_store.get_story(story_id)
         
-        if story_id not in stories:
+        if story_data is None:
             return jsonify({"success": False, "error": "Story not found"}), 404
         
-        story_data = stories[story_id]
-        
-        # Import agents
-        from agents.conference_manager import conference_manager
-        
-        # Start agent conference
-        conference_result = conference_manager.run_discussion_round(story_data, 1)
+        # Start agent conference once the caller's fair share allows it
+        try:
+            with conference_scheduler.slot(scheduler_user(data), INTERACTIVE):
+                conference_result = conference_manager.run_discussion_round(story_data, 1)
+        except SchedulerBusy as e:
+            return scheduler_busy_response(e)
         
         return jsonify({
             "success": True,
@@ -219,6 +523,287 @@ def analyze_story():
             "error": f"Analysis failed: {str(e)}"
         }), 500
 
+MAX_ANALYSIS_BATCH = 500
+
+@app.route('/api/story/analyze/batch', methods=['POST'])
+def analyze_story_batch():
+    """Analyze many stories, sharing agent work between stories with the same inputs"""
+    try:
+        data = request.get_json() or {}
+        story_ids = data.get('story_ids')
+        
+        if not isinstance(story_ids, list) or not story_ids:
+            return jsonify({"success": False, "error": "A non-empty list of story_ids is required"}), 400
+        if not all(isinstance(story_id, str) and story_id for story_id in story_ids):
+            return jsonify({"success": False, "error": "Every story_id must be a non-empty string"}), 400
+        
+        if len(story_ids) > MAX_ANALYSIS_BATCH:
+            return jsonify({
+                "success": False,
+                "error": f"At most {MAX_ANALYSIS_BATCH} stories per batch"
+            }), 413
+        
+        try:
+            last_round = int(data.get('max_rounds', 1))
+        except (TypeError, ValueError):
+            last_round = 0
+        if not 1 <= last_round <= conference_manager.max_rounds:
+            return jsonify({
+                "success": False,
+                "error": f"max_rounds must be between 1 and {conference_manager.max_rounds}"
+            }), 400
+        
+        # One storage pass for every story
+        stories = story_store.get_stories(story_ids)
+        # Bulk lane, charged to the caller by story count
+        try:
+            with conference_scheduler.slot(scheduler_user(data), BULK, cost=max(len(stories), 1)):
+                analyses, stats = conference_manager.run_batch(list(stories.values()), last_round)
+        except SchedulerBusy as e:
+            return scheduler_busy_response(e)
+        missing = [story_id for story_id in dict.fromkeys(story_ids) if story_id not in stories]
+        
+        return jsonify({
+            "success": bool(analyses),
+            "analyses": analyses,
+            "missing": missing,
+            "stats": stats
+        }), 200 if analyses else 404
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Batch analysis failed: {str(e)}"
+        }), 500
+
+@app.route('/api/story/analyze/stream', methods=['POST'])
+def analyze_story_stream():
+    """Run the full multi-round conference, streaming each round as NDJSON once it completes
+    
+    Passing the conference_id of an earlier stream resumes after its last completed
+    round (a finished conference only gets its final result in the done event),
+    from_round picks the first round to send and max_rounds stops early,
+    disconnecting also stops the remaining rounds.
+    """
+    data = request.get_json() or {}
+    story_id = data.get('story_id')
+    conference_id = data.get('conference_id')
+    
+    conference = None
+    if conference_id:
+        conference = conference_store.get(conference_id)
+        if conference is None:
+            return jsonify({"success": False, "error": "Conference not found or expired"}), 404
+        story_id = conference.story_id
+    
+    if not story_id:
+        return jsonify({"success": False, "error": "Story ID required"}), 400
+    
+    try:
+        last_round = int(data.get('max_rounds', conference_manager.max_rounds))
+        resume_round = min(conference.current_round + 1, last_round) if conference else 1
+        first_round = int(data.get('from_round', resume_round))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "from_round and max_rounds must be integers"}), 400
+    
+    if not 1 <= first_round <= min(last_round, conference_manager.max_rounds):
+        return jsonify({
+            "success": False,
+            "error": f"Rounds must satisfy 1 <= from_round <= max_rounds <= {conference_manager.max_rounds}"
+        }), 400
+    
+    if conference is None:
+        story_data = story_store.get_story(story_id)
+        if story_data is None:
+            return jsonify({"success": False, "error": "Story not found"}), 404
+        conference = conference_store.create(story_data)
+    
+    caller = scheduler_user(data)
+    final_round = min(last_round, conference_manager.max_rounds)
+    # Resuming a conference that already reached its last round has nothing left to run
+    finished = 'from_round' not in data and conference.current_round >= final_round
+    
+    def rounds():
+        completed = []
+        if finished:
+            yield {"type": "done", "conference_id": conference.id, "story_id": story_id,
+                   "completed_rounds": completed, "analysis": conference.rounds[final_round - 1]}
+            return
+        rounds_iter = conference_manager.run_conference(conference.story, first_round, last_round,
+                                                        conference=conference)
+        try:
+            while True:
+                # One slot per round, so a long conference does not hold a slot while the client reads
+                with conference_scheduler.slot(caller, INTERACTIVE):
+                    result = next(rounds_iter, None)
+                if result is None:
+                    break
+                completed.append(result["round"])
+                yield {"type": "round", "conference_id": conference.id, "story_id": story_id,
+                       "round": result["round"], "analysis": result}
+            yield {"type": "done", "conference_id": conference.id, "story_id": story_id,
+                   "completed_rounds": completed}
+        except Exception as e:
+            # Headers are already sent, report the failure in-band
+            yield {"type": "error", "conference_id": conference.id, "story_id": story_id,
+                   "completed_rounds": completed, "error": f"Analysis failed: {str(e)}"}
+    
+    return Response(
+        stream_with_context(export_ndjson(rounds())),
+        mimetype='application/x-ndjson',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/api/conference/<conference_id>')
+def get_conference(conference_id):
+    conference = conference_store.get(conference_id)
+    
+    if conference is None:
+        return jsonify({"success": False, "error": "Conference not found or expired"}), 404
+    
+    # Rounds are only ever appended, so the round count versions the conference
+    etag = etag_for("conference", conference.id, conference.current_round)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    response = jsonify({"success": True, "conference": conference.to_dict()})
+    response.set_etag(etag)
+    return response, 200
+
+@app.route('/api/story/analyze/jobs', methods=['POST'])
+def submit_analysis_job():
+    """Queue an analysis and return immediately with a job id"""
+    try:
+        data = request.get_json()
+        story_id = data.get('story_id')
+        
+        if not story_id:
+            return jsonify({"success": False, "error": "Story ID required"}), 400
+        
+        story_data = story_store.get_story(story_id)
+        if story_data is None:
+            return jsonify({"success": False, "error": "Story not found"}), 404
+        
+        try:
+            job = analysis_jobs.submit("analysis", story_id, owner=scheduler_user(data))
+        except QueueFull:
+            response = jsonify({"success": False, "error": "Analysis queue is full, please retry shortly"})
+            response.headers["Retry-After"] = "5"
+            return response, 503
+        
+        return jsonify({
+            "success": True,
+            "job_id": job["id"],
+            "status": job["status"],
+            "poll_url": f"/api/jobs/{job['id']}",
+            "events_url": f"/api/jobs/{job['id']}/events"
+        }), 202
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Could not queue analysis: {str(e)}"
+        }), 500
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    job = analysis_jobs.get(job_id)
+    
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    
+    etag = etag_for("job", job_id, job["updated_at"])
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    response = jsonify({"success": True, "job": public_job(job)})
+    response.set_etag(etag)
+    return response, 200
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events: one `status` event per job change until it finishes"""
+    if analysis_jobs.get(job_id) is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    
+    def events():
+        last_updated = None
+        while True:
+            job = analysis_jobs.wait_for_change(job_id, last_updated, timeout=15)
+            if job is None:
+                return
+            if job["updated_at"] == last_updated:
+                # Keep proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            last_updated = job["updated_at"]
+            yield f"event: status\ndata: {json.dumps(public_job(job))}\n\n"
+            if job["status"] in TERMINAL_STATUSES:
+                return
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/api/analysis/scheduler')
+def analysis_scheduler_stats():
+    return jsonify(conference_scheduler.stats())
+
+@app.route('/api/analysis/cache')
+def analysis_cache_stats():
+    return jsonify(analysis_cache.stats())
+
+@app.route('/api/metrics')
+def prometheus_metrics():
+    """Metrics of this worker process in the Prometheus text format"""
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Bulk export/import endpoints (admin only)
+
+@app.route('/api/export/<collection>')
+def export_collection(collection):
+    if not admin_authorized():
+        return jsonify({"success": False, "error": "Admin token required"}), 403
+    
+    if collection == 'stories':
+        records = story_store.iter_stories()
+    elif collection == 'users':
+        records = storage.iter_users()
+    else:
+        return jsonify({"success": False, "error": "Unknown collection"}), 404
+    
+    return Response(
+        stream_with_context(export_ndjson(records)),
+        mimetype='application/x-ndjson',
+        headers={"Content-Disposition": f"attachment; filename={collection}.ndjson"}
+    )
+
+@app.route('/api/import/<collection>', methods=['POST'])
+def import_collection(collection):
+    if not admin_authorized():
+        return jsonify({"success": False, "error": "Admin token required"}), 403
+    
+    try:
+        # Read the body line by line instead of buffering it
+        if collection == 'stories':
+            result = import_stories(story_store, request.stream)
+        elif collection == 'users':
+            result = import_users(storage, request.stream)
+        else:
+            return jsonify({"success": False, "error": "Unknown collection"}), 404
+        
+        return jsonify({"success": True, **result}), 200
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Import failed: {str(e)}"
+        }), 500
+
 if __name__ == '__main__':
     # Create data directories
     os.makedirs('data', exist_ok=True)
@@ -0,0 +1,156 @@
+"""
+Password hashing for DreamScape
+Salted scrypt (or PBKDF2) hashes computed on a dedicated, bounded worker pool so a
+burst of logins queues up here instead of stalling every other request thread
+"""
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.fork import after_fork
+
+
+class HashPoolBusy(Exception):
+    """Raised when the hash queue is full"""
+
+
+class PasswordHasher:
+    def __init__(self, algorithm=None, max_workers=None, max_queue=None):
+        self.algorithm = algorithm or os.environ.get("DREAMSCAPE_PASSWORD_KDF", "scrypt")
+        if self.algorithm not in ("scrypt", "pbkdf2_sha256"):
+            raise ValueError(f"Unknown password KDF: {self.algorithm}")
+
+        # KDF cost, raising any of these upgrades existing hashes on next login
+        self.scrypt_n = int(os.environ.get("DREAMSCAPE_SCRYPT_N", 2 ** 14))
+        self.scrypt_r = int(os.environ.get("DREAMSCAPE_SCRYPT_R", 8))
+        self.scrypt_p = int(os.environ.get("DREAMSCAPE_SCRYPT_P", 1))
+        self.pbkdf2_iterations = int(os.environ.get("DREAMSCAPE_PBKDF2_ITERATIONS", 600000))
+
+        # Every worker process has its own pool, so by default they split the CPUs between them
+        processes = max(1, int(os.environ.get("WEB_CONCURRENCY", 1)))
+        self.max_workers = max_workers or int(os.environ.get("DREAMSCAPE_HASH_WORKERS",
+                                                             max(1, (os.cpu_count() or 2) // processes)))
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get("DREAMSCAPE_HASH_QUEUE", 64))
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._dummy_hash = None
+        after_fork(self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._active = 0
+
+    def _pool(self):
+        if self._executor is None:
+            with self._stats_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="password-hash")
+        return self._executor
+
+    def _run(self, fn, *args):
+        """Run fn on the hash pool and wait for it, rejecting work once the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise HashPoolBusy("Password hashing queue is full")
+
+        with self._stats_lock:
+            self._in_flight += 1
+
+        def task():
+            with self._stats_lock:
+                self._active += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._stats_lock:
+                    self._active -= 1
+                    self._in_flight -= 1
+                    self._completed += 1
+                self._slots.release()
+
+        try:
+            future = self._pool().submit(task)
+        except BaseException:
+            with self._stats_lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+        return future.result()
+
+    # Hash formats
+    def _hash_sync(self, password):
+        salt = os.urandom(16)
+        if self.algorithm == "scrypt":
+            digest = hashlib.scrypt(password.encode(), salt=salt, n=self.scrypt_n, r=self.scrypt_r,
+                                    p=self.scrypt_p, maxmem=256 * self.scrypt_n * self.scrypt_r * self.scrypt_p)
+            return f"scrypt${self.scrypt_n}${self.scrypt_r}${self.scrypt_p}${salt.hex()}${digest.hex()}"
+
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, self.pbkdf2_iterations)
+        return f"pbkdf2_sha256${self.pbkdf2_iterations}${salt.hex()}${digest.hex()}"
+
+    def _verify_sync(self, password, stored_hash):
+        parts = stored_hash.split("$")
+
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            digest = hashlib.scrypt(password.encode(), salt=bytes.fromhex(parts[4]), n=n, r=r, p=p,
+                                    maxmem=256 * n * r * p)
+            return hmac.compare_digest(digest.hex(), parts[5])
+
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            digest = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(parts[2]), int(parts[1]))
+            return hmac.compare_digest(digest.hex(), parts[3])
+
+        # Legacy unsalted SHA-256
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored_hash)
+
+    def hash(self, password):
+        """Hash a password with a fresh salt"""
+        return self._run(self._hash_sync, password)
+
+    def verify(self, password, stored_hash):
+        """Check a password against any supported hash format"""
+        return self._run(self._verify_sync, password, stored_hash)
+
+    def verify_dummy(self, password):
+        """Verify against a throwaway hash and fail, so an unknown user costs as much as a wrong password"""
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash(os.urandom(16).hex())
+        self.verify(password, self._dummy_hash)
+        return False
+
+    def needs_rehash(self, stored_hash):
+        """True for legacy hashes and hashes made with other KDF settings"""
+        if self.algorithm == "scrypt":
+            prefix = f"scrypt${self.scrypt_n}${self.scrypt_r}${self.scrypt_p}$"
+        else:
+            prefix = f"pbkdf2_sha256${self.pbkdf2_iterations}$"
+        return not stored_hash.startswith(prefix)
+
+    def metrics(self):
+        with self._stats_lock:
+            return {
+                "algorithm": self.algorithm,
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": self._in_flight - self._active,
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+
+# Global instance
+password_hasher = PasswordHasher()
@@ -0,0 +1,155 @@
+"""
+Session Cache - serves session validation from memory
+last_active updates are coalesced into periodic flushes and an expiry heap
+lets a background sweeper drop expired sessions without scanning
+With several worker processes, cached entries are re-read from storage after
+revalidate_after seconds so a logout in one worker reaches the others
+"""
+import atexit
+import heapq
+import os
+import threading
+import time
+from datetime import datetime
+from utils.fork import after_fork
+
+
+class SessionCache:
+    def __init__(self, storage, flush_interval=None, sweep_interval=None, revalidate_after=None):
+        self.storage = storage
+        self.flush_interval = flush_interval or float(os.environ.get("DREAMSCAPE_SESSION_FLUSH_INTERVAL", 5))
+        self.sweep_interval = sweep_interval or float(os.environ.get("DREAMSCAPE_SESSION_SWEEP_INTERVAL", 60))
+        # 0 trusts the cache until expiry, which is only safe with a single process
+        if revalidate_after is None:
+            revalidate_after = float(os.environ.get("DREAMSCAPE_SESSION_REVALIDATE", 0))
+        self.revalidate_after = revalidate_after
+
+        self._sessions = {}       # session_id -> session record
+        self._expiry_heap = []    # (expires_at, session_id)
+        self._dirty = {}          # session_id -> last_active waiting to be flushed
+        self._cached_at = {}      # session_id -> monotonic time it was read from storage
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        after_fork(self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        was_running = self._worker is not None
+        self._worker = None
+        if was_running:
+            self.start()
+
+    def start(self):
+        """Start the background flush/sweep thread once, from the serving process"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="session-cache", daemon=True)
+            self._worker.start()
+        atexit.unregister(self.flush)
+        atexit.register(self.flush)
+
+    def stop(self):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+        self.flush()
+
+    def _run(self):
+        next_sweep = 0
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.monotonic() >= next_sweep:
+                    self.sweep()
+                    next_sweep = time.monotonic() + self.sweep_interval
+            except Exception as e:
+                print(f"Session cache maintenance failed: {e}")
+
+    def _cache(self, session_id, session):
+        cached = self._sessions.get(session_id)
+        if cached is not None:
+            # Keep activity recorded here that has not been flushed yet
+            session["last_active"] = max(session["last_active"] or "", cached["last_active"] or "")
+        self._sessions[session_id] = session
+        self._cached_at[session_id] = time.monotonic()
+        if cached is None or cached["expires_at"] != session["expires_at"]:
+            heapq.heappush(self._expiry_heap, (session["expires_at"], session_id))
+
+    def _forget(self, session_id):
+        self._sessions.pop(session_id, None)
+        self._cached_at.pop(session_id, None)
+        self._dirty.pop(session_id, None)
+
+    def get(self, session_id):
+        """Return the cached session, falling back to storage on a miss"""
+        session = self._sessions.get(session_id)
+        if session is not None and (
+                not self.revalidate_after
+                or time.monotonic() - self._cached_at.get(session_id, 0) < self.revalidate_after):
+            return session
+
+        session = self.storage.get_session(session_id)
+        with self._lock:
+            if session is None:
+                self._forget(session_id)
+            else:
+                self._cache(session_id, session)
+        return session
+
+    def add(self, session_id, session):
+        self.storage.add_session(session_id, session)
+        with self._lock:
+            self._cache(session_id, session)
+
+    def touch(self, session_id, last_active):
+        """Record activity in memory, the write happens on the next flush"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session["last_active"] = last_active
+                self._dirty[session_id] = last_active
+
+    def remove(self, session_id):
+        with self._lock:
+            self._forget(session_id)
+        # Heap entries for removed sessions are skipped lazily by the sweeper
+        self.storage.delete_session(session_id)
+
+    def flush(self):
+        """Write all pending last_active updates in one batch"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            pending, self._dirty = self._dirty, {}
+        self.storage.touch_sessions(pending)
+        return len(pending)
+
+    def sweep(self, now=None):
+        """Drop expired sessions from memory and storage"""
+        now = now or datetime.now().isoformat()
+        expired = 0
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] < now:
+                expires_at, session_id = heapq.heappop(self._expiry_heap)
+                session = self._sessions.get(session_id)
+                if session is not None and session["expires_at"] == expires_at:
+                    self._forget(session_id)
+                    expired += 1
+        # One indexed range delete also catches sessions this process never cached
+        self.storage.delete_expired_sessions(now)
+        return expired
+
+    def stats(self):
+        return {
+            "cached_sessions": len(self._sessions),
+            "pending_writes": len(self._dirty),
+            "heap_size": len(self._expiry_heap)
+        }
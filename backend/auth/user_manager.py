@@ -1,34 +1,22 @@
 """
 User authentication and management system for DreamScape
 """
-import json
-import os
-import hashlib
 import uuid
 from datetime import datetime, timedelta
-from pathlib import Path
+from utils.storage import storage as default_storage, USERNAME_TAKEN, EMAIL_TAKEN
+from auth.session_cache import SessionCache
+from auth.password_hasher import password_hasher, HashPoolBusy
 
 class UserManager:
-    def __init__(self):
-        self.users_file = "data/users.json"
-        self.sessions_file = "data/sessions.json"
-        self.ensure_data_files()
-    
-    def ensure_data_files(self):
-        """Create data files if they don't exist"""
-        Path("data").mkdir(exist_ok=True)
-        
-        if not os.path.exists(self.users_file):
-            with open(self.users_file, 'w') as f:
-                json.dump({}, f)
-        
-        if not os.path.exists(self.sessions_file):
-            with open(self.sessions_file, 'w') as f:
-                json.dump({}, f)
+    def __init__(self, storage=None, hasher=None):
+        self.storage = storage or default_storage
+        self.hasher = hasher or password_hasher
+        # Maintenance starts with the first request (app.py), never in a preloading master
+        self.sessions = SessionCache(self.storage)
     
     def hash_password(self, password):
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash password with the configured KDF (runs on the hash pool)"""
+        return self.hasher.hash(password)
     
     def register_user(self, username, password, email):
         """Register new user"""
@@ -43,23 +31,18 @@ class UserManager:
             if len(password) < 6:
                 return {"success": False, "error": "Password must be at least 6 characters"}
             
-            # Load existing users
-            with open(self.users_file, 'r') as f:
-                users = json.load(f)
-            
             # Check if username exists
-            if username in users:
+            if self.storage.get_user(username):
                 return {"success": False, "error": "Username already exists"}
             
-            # Check if email exists
-            for user_data in users.values():
-                if user_data.get("email") == email:
-                    return {"success": False, "error": "Email already registered"}
+            # Check if email exists (indexed, case-insensitive)
+            if self.storage.get_username_by_email(email):
+                return {"success": False, "error": "Email already registered"}
             
             # Create new user
             password_hash = self.hash_password(password)
             
-            users[username] = {
+            user = {
                 "username": username,
                 "email": email,
                 "password_hash": password_hash,
@@ -79,97 +62,91 @@ class UserManager:
                 }
             }
             
-            # Save users
-            with open(self.users_file, 'w') as f:
-                json.dump(users, f, indent=2)
+            # Save user (the insert itself guards against a concurrent registration)
+            outcome = self.storage.add_user(user)
+            if outcome == USERNAME_TAKEN:
+                return {"success": False, "error": "Username already exists"}
+            if outcome == EMAIL_TAKEN:
+                return {"success": False, "error": "Email already registered"}
             
             return {"success": True, "message": "User registered successfully"}
             
+        except HashPoolBusy:
+            return {"success": False, "busy": True, "error": "Server busy, please try again"}
         except Exception as e:
             return {"success": False, "error": f"Registration failed: {str(e)}"}
     
     def login_user(self, username, password):
         """Login user and create session"""
         try:
-            # Load users
-            with open(self.users_file, 'r') as f:
-                users = json.load(f)
+            user = self.storage.get_user(username)
             
-            if username not in users:
+            if user is None:
+                # Same KDF cost as a wrong password, so timing does not reveal which usernames exist
+                self.hasher.verify_dummy(password)
                 return {"success": False, "error": "Invalid username or password"}
             
             # Verify password
-            password_hash = self.hash_password(password)
-            if users[username]["password_hash"] != password_hash:
+            if not self.hasher.verify(password, user["password_hash"]):
                 return {"success": False, "error": "Invalid username or password"}
             
+            # Upgrade legacy SHA-256 (or outdated KDF) hashes while we have the password
+            user_updates = {"last_login": datetime.now().isoformat()}
+            if self.hasher.needs_rehash(user["password_hash"]):
+                user_updates["password_hash"] = self.hash_password(password)
+            
             # Create session
             session_id = str(uuid.uuid4())
             
-            with open(self.sessions_file, 'r') as f:
-                sessions = json.load(f)
-            
-            sessions[session_id] = {
+            self.sessions.add(session_id, {
                 "username": username,
                 "created_at": datetime.now().isoformat(),
                 "last_active": datetime.now().isoformat(),
                 "expires_at": (datetime.now() + timedelta(hours=24)).isoformat()
-            }
-            
-            with open(self.sessions_file, 'w') as f:
-                json.dump(sessions, f, indent=2)
+            })
             
             # Update user last login
-            users[username]["last_login"] = datetime.now().isoformat()
-            with open(self.users_file, 'w') as f:
-                json.dump(users, f, indent=2)
+            self.storage.update_user(username, user_updates)
             
             return {
                 "success": True,
                 "session_id": session_id,
                 "username": username,
                 "user_data": {
-                    "email": users[username]["email"],
-                    "preferences": users[username]["preferences"],
-                    "statistics": users[username]["statistics"]
+                    "email": user["email"],
+                    "preferences": user["preferences"],
+                    "statistics": user["statistics"]
                 },
                 "message": "Login successful"
             }
             
+        except HashPoolBusy:
+            return {"success": False, "busy": True, "error": "Server busy, please try again"}
         except Exception as e:
             return {"success": False, "error": f"Login failed: {str(e)}"}
     
     def validate_session(self, session_id):
         """Validate user session"""
         try:
-            with open(self.sessions_file, 'r') as f:
-                sessions = json.load(f)
+            session = self.sessions.get(session_id)
             
-            if session_id not in sessions:
+            if session is None:
                 return {"valid": False, "error": "Session not found"}
             
-            session = sessions[session_id]
-            
             # Check if session expired
-            expires_at = datetime.fromisoformat(session["expires_at"])
-            if datetime.now() > expires_at:
+            now = datetime.now().isoformat()
+            if now > session["expires_at"]:
                 # Remove expired session
-                del sessions[session_id]
-                with open(self.sessions_file, 'w') as f:
-                    json.dump(sessions, f, indent=2)
+                self.sessions.remove(session_id)
                 return {"valid": False, "error": "Session expired"}
             
-            # Update last active
-            session["last_active"] = datetime.now().isoformat()
-            sessions[session_id] = session
-            
-            with open(self.sessions_file, 'w') as f:
-                json.dump(sessions, f, indent=2)
+            # Update last active (written to storage on the next cache flush)
+            self.sessions.touch(session_id, now)
             
             return {
                 "valid": True,
                 "username": session["username"],
-                "session_data": session
+                "session_data": dict(session)
             }
             
         except Exception as e:
@@ -178,30 +155,38 @@ class UserManager:
     def logout_user(self, session_id):
         """Logout user and remove session"""
         try:
-            with open(self.sessions_file, 'r') as f:
-                sessions = json.load(f)
-            
-            if session_id in sessions:
-                del sessions[session_id]
-                
-                with open(self.sessions_file, 'w') as f:
-                    json.dump(sessions, f, indent=2)
+            self.sessions.remove(session_id)
             
             return {"success": True, "message": "Logged out successfully"}
             
         except Exception as e:
             return {"success": False, "error": f"Logout failed: {str(e)}"}
     
+    def find_user_by_email(self, email):
+        """Look up a username by email"""
+        try:
+            if not email:
+                return {"success": False, "error": "Email is required"}
+            
+            username = self.storage.get_username_by_email(email)
+            
+            if username is None:
+                return {"success": False, "error": "User not found"}
+            
+            return {"success": True, "username": username}
+            
+        except Exception as e:
+            return {"success": False, "error": f"Failed to look up email: {str(e)}"}
+    
     def get_user_data(self, username):
         """Get user data"""
         try:
-            with open(self.users_file, 'r') as f:
-                users = json.load(f)
+            user = self.storage.get_user(username)
             
-            if username not in users:
+            if user is None:
                 return {"success": False, "error": "User not found"}
             
-            user_data = users[username].copy()
+            user_data = user.copy()
             # Remove sensitive data
             del user_data["password_hash"]
             
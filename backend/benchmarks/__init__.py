@@ -0,0 +1,10 @@
+"""
+Benchmarks - reproducible performance measurements for DreamScape
+Not part of the app. Run from the backend directory; every run works on synthetic
+data in a throwaway data directory and writes a JSON report (p50/p95/p99 latency
+and throughput per operation) that can be diffed against an earlier run:
+
+    python -m benchmarks.micro --sizes 1000 10000 100000 --output micro.json
+    python -m benchmarks.load --clients 16 --duration 30 --output load.json
+    python -m benchmarks.compare baseline.json micro.json
+"""
@@ -0,0 +1,70 @@
+"""
+Compare two benchmark reports of the same kind and flag regressions
+Exits with status 1 when any operation got slower (or its throughput dropped) by
+more than the threshold, so it can gate a CI job:
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 15
+"""
+import argparse
+import json
+
+LATENCY_FIELDS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def operations(report):
+    """Flatten a micro or load report to {name: summary}"""
+    if report.get("benchmark") == "micro":
+        return {f"{run['size']}/{name}": summary
+                for run in report["runs"] for name, summary in run["operations"].items()}
+    flat = {f"load/{name}": summary for name, summary in report["operations"].items()}
+    flat["load/overall"] = report["overall"]
+    return flat
+
+
+def change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(baseline, candidate, threshold):
+    """Rows of (operation, field, before, after, percent change, regressed)"""
+    before_ops, after_ops = operations(baseline), operations(candidate)
+    rows = []
+    for name in sorted(before_ops.keys() & after_ops.keys()):
+        before, after = before_ops[name], after_ops[name]
+        for field in LATENCY_FIELDS + ("throughput_per_s",):
+            percent = change(before.get(field), after.get(field))
+            if percent is None:
+                continue
+            # Latency regresses upwards, throughput downwards
+            regressed = percent > threshold if field in LATENCY_FIELDS else percent < -threshold
+            rows.append((name, field, before[field], after[field], round(percent, 1), regressed))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare two DreamScape benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if baseline.get("benchmark") != candidate.get("benchmark"):
+        raise SystemExit("Reports come from different benchmarks")
+
+    rows = compare(baseline, candidate, args.threshold)
+    regressions = [row for row in rows if row[5]]
+    print(json.dumps({
+        "threshold_percent": args.threshold,
+        "baseline_commit": baseline["environment"].get("git_commit"),
+        "candidate_commit": candidate["environment"].get("git_commit"),
+        "regressions": [{"operation": name, "metric": field, "baseline": before, "candidate": after,
+                         "change_percent": percent} for name, field, before, after, percent, _ in regressions],
+        "compared": len(rows)
+    }, indent=2))
+    raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,98 @@
+"""
+Synthetic users, sessions and stories for the benchmarks
+Generation is seeded, so two runs with the same arguments load identical data
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Fantasy", "Sci-Fi"]
+MOODS = ["Exciting", "Romantic", "Mysterious", "Funny"]
+PASSWORD = "benchmark-password"
+
+
+def username_for(index):
+    return f"bench_user_{index:06d}"
+
+
+def synthetic_users(count, password_hash):
+    """Every user shares one precomputed hash, seeding should not pay the KDF per user"""
+    now = datetime.now().isoformat()
+    for index in range(count):
+        yield {
+            "username": username_for(index),
+            "email": f"{username_for(index)}@bench.dreamscape",
+            "password_hash": password_hash,
+            "created_at": now,
+            "last_login": None,
+            "stories": {},
+            "preferences": {"default_genre": "fantasy", "default_mood": "epic", "preferred_duration": "medium"},
+            "statistics": {"stories_created": 0, "stories_completed": 0, "discussion_rounds": 0,
+                           "total_time_spent": 0}
+        }
+
+
+def synthetic_sessions(count, users, rng):
+    """(session_id, session) pairs spread over the first users, all valid for a day"""
+    now = datetime.now()
+    for _ in range(count):
+        yield str(uuid.UUID(int=rng.getrandbits(128))), {
+            "username": username_for(rng.randrange(users)),
+            "created_at": now.isoformat(),
+            "last_active": now.isoformat(),
+            "expires_at": (now + timedelta(hours=24)).isoformat()
+        }
+
+
+def synthetic_story(rng, username, created_at=None):
+    """A story record shaped like the ones POST /api/story/create stores"""
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "title": f"The {rng.choice(['Lost', 'Hidden', 'Last', 'Silent'])} {rng.choice(['City', 'Signal', 'Door', 'Tide'])}",
+        "genre": rng.choice(GENRES),
+        "mood": rng.choice(MOODS),
+        "idea": f"A story about {rng.choice(['explorers', 'a detective', 'two rivals', 'a robot'])} "
+                f"who find {rng.choice(['a map', 'a secret', 'a portal', 'an old letter'])} #{rng.randrange(10 ** 6)}",
+        "created_at": (created_at or datetime.now()).isoformat(),
+        "username": username,
+        "status": "in_progress"
+    }
+
+
+def synthetic_stories(count, users, rng):
+    """Stories spread over users, with creation times one second apart"""
+    start = datetime.now() - timedelta(seconds=count)
+    for index in range(count):
+        yield synthetic_story(rng, username_for(rng.randrange(users)), start + timedelta(seconds=index))
+
+
+def batched(records, size=5000):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(storage, story_store, hasher, users, sessions, stories, seed_value=0):
+    """Load a synthetic dataset, returns (session ids, story ids) for the benchmarks to sample"""
+    rng = random.Random(seed_value)
+    password_hash = hasher.hash(PASSWORD)
+    for batch in batched(synthetic_users(users, password_hash)):
+        storage.add_users(batch)
+
+    session_ids = []
+    for batch in batched(synthetic_sessions(sessions, users, rng)):
+        with storage.transaction():
+            for session_id, session in batch:
+                storage.add_session(session_id, session)
+                session_ids.append(session_id)
+
+    story_ids = []
+    for batch in batched(synthetic_stories(stories, users, rng)):
+        story_store.add_stories(batch)
+        story_ids.extend(story["id"] for story in batch)
+    return session_ids, story_ids
@@ -0,0 +1,117 @@
+"""
+Shared plumbing for the benchmark scripts: latency summaries, data isolation,
+the optional stub model server and JSON reports
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Summary of per-call latencies (seconds) over a wall-clock window of elapsed seconds"""
+    ordered = sorted(latencies)
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(ordered) / elapsed, 2) if elapsed > 0 else None,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else None
+    }
+
+
+def succeeded(result):
+    """The app reports most failures as {"success": False} or {"valid": False} rather than raising"""
+    return not (isinstance(result, dict) and (result.get("success") is False or result.get("valid") is False))
+
+
+def measure(fn, args_list):
+    """Call fn(*args) for every args tuple in turn, returns the summary of the calls
+
+    Failed calls are counted as errors and left out of the latencies
+    """
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for args in args_list:
+        call_started = time.perf_counter()
+        try:
+            ok = succeeded(fn(*args))
+        except Exception:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - call_started)
+        else:
+            errors += 1
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def isolated_data_dir(prefix="dreamscape-bench-"):
+    """Point DREAMSCAPE_DATA_DIR at a fresh temporary directory
+
+    Must run before the app modules are imported, their global storage is opened at import
+    """
+    data_dir = tempfile.mkdtemp(prefix=prefix)
+    os.environ["DREAMSCAPE_DATA_DIR"] = data_dir
+    for name in ("DREAMSCAPE_DB_PATH", "DREAMSCAPE_ANALYSIS_DB", "DREAMSCAPE_JOBS_DB",
+                 "DREAMSCAPE_ANALYSIS_CACHE_DB"):
+        os.environ.pop(name, None)
+    return data_dir
+
+
+def start_model_stub(latency_ms, jitter_ms=0):
+    """Serve agents.model_stub on a free local port and route the agents to it
+
+    Like isolated_data_dir, must run before the agents are imported
+    """
+    from agents.model_stub import StubConfig, serve
+    server = serve(port=0, config=StubConfig(latency_ms=latency_ms, jitter_ms=jitter_ms))
+    os.environ["DREAMSCAPE_MODEL_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    return server
+
+
+def environment():
+    """What a result depends on besides the code, recorded with every report"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {name: value for name, value in sorted(os.environ.items())
+                     if name.startswith("DREAMSCAPE_") and name not in ("DREAMSCAPE_ADMIN_TOKEN", "DREAMSCAPE_DATA_DIR")}
+    }
+
+
+def write_report(report, output=None):
+    """Print the report as JSON, and also save it when an output path is given"""
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + "\n")
+    print(text)
@@ -0,0 +1,249 @@
+"""
+Closed-loop HTTP load generator
+Each client registers and logs in once, then sends its next request as soon as the
+previous one is answered (no think time by default), drawing operations from a
+weighted mix of auth, story and analyze calls. Requests during the warm-up are
+not counted. Without --url the app runs in-process through the Flask test client
+on a throwaway data directory, with --url a running server is loaded over HTTP:
+
+    python -m benchmarks.load --clients 16 --duration 30 --output load.json
+    python -m benchmarks.load --url http://127.0.0.1:5000 --clients 64 --duration 60
+"""
+import argparse
+import http.client
+import json
+import random
+import shutil
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+from benchmarks.harness import environment, isolated_data_dir, start_model_stub, summarize, write_report
+
+# Relative weights of the operations each client picks from
+DEFAULT_MIX = {
+    "validate_session": 40,
+    "list_stories": 20,
+    "create_story": 15,
+    "get_analysis": 10,
+    "analyze": 10,
+    "login": 5
+}
+
+
+class InProcessTarget:
+    """The app itself through Flask's test client, one client per thread"""
+
+    def __init__(self):
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, payload=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=payload)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HTTPTarget:
+    """A running server, one keep-alive connection per thread"""
+
+    def __init__(self, url, timeout=60):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, method, path, payload=None):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        body = json.dumps(payload) if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next request
+            connection.close()
+            self._local.connection = None
+            raise
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+
+class Client:
+    """One closed-loop user: its own account, session and stories"""
+
+    def __init__(self, target, name, rng):
+        self.target = target
+        self.username = name
+        self.password = "load-test-password"
+        self.rng = rng
+        self.session_id = None
+        self.story_ids = []
+
+    def setup(self):
+        status, _ = self.target.request("POST", "/api/auth/register", {
+            "username": self.username, "password": self.password, "email": f"{self.username}@load.dreamscape"})
+        if status != 201:
+            raise RuntimeError(f"Could not register {self.username} (HTTP {status})")
+        if self.login() != 200:
+            raise RuntimeError(f"Could not log in {self.username}")
+        if self.create_story() != 200:
+            raise RuntimeError(f"Could not create a story for {self.username}")
+
+    def login(self):
+        status, body = self.target.request("POST", "/api/auth/login",
+                                           {"username": self.username, "password": self.password})
+        if status == 200:
+            self.session_id = body["session_id"]
+        return status
+
+    def validate_session(self):
+        return self.target.request("POST", "/api/auth/validate", {"session_id": self.session_id})[0]
+
+    def create_story(self):
+        status, body = self.target.request("POST", "/api/story/create", {
+            "title": f"Load story {len(self.story_ids)}",
+            "genre": self.rng.choice(["Action", "Comedy", "Drama", "Horror", "Fantasy", "Sci-Fi"]),
+            "mood": self.rng.choice(["Exciting", "Romantic", "Mysterious", "Funny"]),
+            "idea": f"A closed-loop benchmark story #{self.rng.randrange(10 ** 6)}",
+            "username": self.username
+        })
+        if status == 200:
+            self.story_ids.append(body["story_id"])
+        return status
+
+    def list_stories(self):
+        return self.target.request("GET", f"/api/user/{self.username}/stories?limit=20")[0]
+
+    def analyze(self):
+        # Charged to this client's user, not to the one address every client shares
+        return self.target.request("POST", "/api/story/analyze", {"story_id": self.rng.choice(self.story_ids),
+                                                                  "session_id": self.session_id})[0]
+
+    def get_analysis(self):
+        return self.target.request("GET", f"/api/story/{self.rng.choice(self.story_ids)}/analysis")[0]
+
+
+def run_client(client, mix, warmup_until, deadline, think_time, results, lock):
+    operations = list(mix)
+    weights = [mix[name] for name in operations]
+    latencies = {name: [] for name in operations}
+    errors = {name: 0 for name in operations}
+    statuses = {}
+
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        name = client.rng.choices(operations, weights)[0]
+        try:
+            status = getattr(client, name)()
+        except Exception:
+            status = "connection_error"
+        finished = time.perf_counter()
+        if now >= warmup_until:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == 200:
+                latencies[name].append(finished - now)
+            else:
+                errors[name] += 1
+        if think_time:
+            time.sleep(think_time)
+
+    with lock:
+        for name in operations:
+            results["latencies"][name].extend(latencies[name])
+            results["errors"][name] += errors[name]
+        for status, count in statuses.items():
+            results["statuses"][status] = results["statuses"].get(status, 0) + count
+
+
+def run_load(target, clients, duration, warmup, mix, think_time, seed):
+    rng = random.Random(seed)
+    run_id = uuid.uuid4().hex[:8]
+    users = [Client(target, f"load_{run_id}_{index}", random.Random(rng.getrandbits(64))) for index in range(clients)]
+    for client in users:
+        client.setup()
+
+    results = {"latencies": {name: [] for name in mix}, "errors": {name: 0 for name in mix}, "statuses": {}}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    warmup_until = started + warmup
+    deadline = warmup_until + duration
+    threads = [threading.Thread(target=run_client, args=(client, mix, warmup_until, deadline, think_time, results, lock),
+                                name=f"load-client-{index}")
+               for index, client in enumerate(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Requests still in flight at the deadline finish late, measure against the real end
+    measured = time.perf_counter() - warmup_until
+
+    every_latency = [latency for latencies in results["latencies"].values() for latency in latencies]
+    return {
+        "overall": summarize(every_latency, measured, sum(results["errors"].values())),
+        "operations": {name: summarize(results["latencies"][name], measured, results["errors"][name]) for name in mix},
+        "status_counts": dict(sorted(results["statuses"].items()))
+    }
+
+
+def parse_mix(values):
+    mix = dict(DEFAULT_MIX)
+    for value in values or []:
+        name, _, weight = value.partition("=")
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown operation {name!r}, choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="DreamScape closed-loop load generator")
+    parser.add_argument("--url", default=None, help="Load a running server instead of the in-process app")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent closed-loop clients")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before the measurement")
+    parser.add_argument("--think-ms", type=float, default=0, help="Pause between a client's requests")
+    parser.add_argument("--mix", nargs="*", metavar="OPERATION=WEIGHT",
+                        help=f"Override operation weights (defaults: {DEFAULT_MIX})")
+    parser.add_argument("--model-latency-ms", type=float, default=None,
+                        help="In-process only: run the agents against a local model stub with this latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    data_dir = None
+    if args.url:
+        target = HTTPTarget(args.url)
+    else:
+        data_dir = isolated_data_dir()
+        if args.model_latency_ms is not None:
+            start_model_stub(args.model_latency_ms)
+        target = InProcessTarget()
+
+    try:
+        result = run_load(target, args.clients, args.duration, args.warmup, mix, args.think_ms / 1000, args.seed)
+    finally:
+        if data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    write_report({
+        "benchmark": "load",
+        "environment": environment(),
+        "parameters": {"target": args.url or "in-process", "clients": args.clients, "duration": args.duration,
+                       "warmup": args.warmup, "think_ms": args.think_ms, "mix": mix,
+                       "model_latency_ms": args.model_latency_ms, "seed": args.seed},
+        **result
+    }, args.output)
@@ -0,0 +1,113 @@
+"""
+Micro-benchmarks of UserManager, the story store and ConferenceManager
+For each dataset size a fresh store is seeded with that many users, sessions and
+stories, then each operation is timed call by call on randomly sampled records:
+
+    python -m benchmarks.micro --sizes 1000 10000 100000 --output micro.json
+    DREAMSCAPE_SCRYPT_N=1024 python -m benchmarks.micro --engine json --sizes 1000
+
+Login cost is dominated by the password KDF, lower DREAMSCAPE_SCRYPT_N to look at
+everything else. --model-latency-ms routes the agents to a local model stub.
+"""
+import argparse
+import os
+import random
+import shutil
+import time
+from benchmarks.harness import environment, isolated_data_dir, measure, start_model_stub, write_report
+
+
+def run_size(size, args, data_dir):
+    # Imported here, after the data directory and model URL are in place
+    from agents.analysis_cache import AnalysisCache
+    from agents.conference_manager import ConferenceManager
+    from auth.user_manager import UserManager
+    from benchmarks.datasets import PASSWORD, seed, synthetic_story, username_for
+    from review.analysis_store import AnalysisStore
+    from utils.storage import create_storage, create_story_store
+
+    size_dir = os.path.join(data_dir, str(size))
+    os.makedirs(size_dir)
+    storage = create_storage(args.engine, size_dir)
+    story_store = create_story_store(storage, args.story_store, size_dir)
+    user_manager = UserManager(storage)
+    manager = ConferenceManager(cache=AnalysisCache(), analysis_store=AnalysisStore(os.path.join(size_dir, "analysis.db")))
+    rng = random.Random(args.seed)
+
+    started = time.perf_counter()
+    session_ids, story_ids = seed(storage, story_store, user_manager.hasher, size, size, size, args.seed)
+    seeded_in = time.perf_counter() - started
+
+    def users(count):
+        return [username_for(rng.randrange(size)) for _ in range(count)]
+
+    results = {}
+    try:
+        results["login_user"] = measure(user_manager.login_user,
+                                        [(username, PASSWORD) for username in users(args.login_iterations)])
+        # Distinct sessions first (read from storage), then the same ones again (session cache hits)
+        sampled = [(session_id,) for session_id in rng.sample(session_ids, min(args.iterations, len(session_ids)))]
+        results["validate_session_cold"] = measure(user_manager.validate_session, sampled)
+        results["validate_session_warm"] = measure(user_manager.validate_session, sampled)
+        results["get_user_data"] = measure(user_manager.get_user_data, [(username,) for username in users(args.iterations)])
+        results["find_user_by_email"] = measure(user_manager.find_user_by_email,
+                                                [(f"{username}@bench.dreamscape",) for username in users(args.iterations)])
+
+        results["create_story"] = measure(story_store.add_story,
+                                          [(synthetic_story(rng, username),) for username in users(args.iterations)])
+        results["list_user_stories"] = measure(lambda username: story_store.list_user_stories(username, limit=20),
+                                               [(username,) for username in users(args.iterations)])
+
+        stories = list(story_store.get_stories(rng.sample(story_ids, min(args.analyze_iterations, len(story_ids)))).values())
+        # Cold: every agent runs. No analysis store, and a cache of its own emptied before each
+        # call, since synthetic stories share agent inputs (genre and mood) with one another
+        cold = ConferenceManager(cache=AnalysisCache(disk_path=os.path.join(size_dir, "cold_cache.db")))
+
+        def run_cold(story):
+            cold.cache.clear()
+            return cold.run_discussion_round(story)
+
+        results["run_discussion_round_cold"] = measure(run_cold, [(story,) for story in stories])
+        # Warm: stories already analyzed once, served from the analysis store and cache
+        for story in stories:
+            manager.run_discussion_round(story)
+        results["run_discussion_round_warm"] = measure(manager.run_discussion_round, [(story,) for story in stories])
+    finally:
+        user_manager.sessions.stop()
+        story_store.close()
+        storage.close()
+
+    return {"size": size, "seed_s": round(seeded_in, 3), "operations": results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="DreamScape micro-benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Users, sessions and stories to seed per run")
+    parser.add_argument("--engine", choices=["sqlite", "json"], default="sqlite")
+    parser.add_argument("--story-store", choices=["storage", "journal"], default=None)
+    parser.add_argument("--iterations", type=int, default=2000, help="Calls per cheap operation")
+    parser.add_argument("--login-iterations", type=int, default=50, help="Calls to login_user (one KDF each)")
+    parser.add_argument("--analyze-iterations", type=int, default=200, help="Stories to run through round 1")
+    parser.add_argument("--model-latency-ms", type=float, default=None,
+                        help="Run the agents against a local model stub with this latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Also write the JSON report here")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the seeded data directory")
+    args = parser.parse_args()
+
+    data_dir = isolated_data_dir()
+    if args.model_latency_ms is not None:
+        start_model_stub(args.model_latency_ms)
+    try:
+        runs = [run_size(size, args, data_dir) for size in args.sizes]
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    write_report({
+        "benchmark": "micro",
+        "environment": environment(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "keep_data")},
+        "runs": runs
+    }, args.output)
@@ -0,0 +1,239 @@
+"""
+Analysis Jobs - background execution of agent conferences
+Jobs are persisted in SQLite, so they survive restarts and can be claimed by any
+worker process; a per-process thread pool claims queued jobs and runs them
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from utils.sqlite import LocalSQLite
+from utils.fork import after_fork
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class QueueFull(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+class JobStore:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            story_id TEXT,
+            owner TEXT,
+            status TEXT NOT NULL,
+            submitted_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT,
+            updated_at TEXT NOT NULL,
+            progress TEXT,
+            result TEXT,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, submitted_at);
+        CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs (owner, status);
+    """
+
+    def __init__(self, db_path):
+        self.db = LocalSQLite(db_path, self.SCHEMA)
+
+    def _job_from_row(self, row):
+        job = dict(row)
+        for field in ("progress", "result"):
+            job[field] = json.loads(job[field]) if job[field] else None
+        return job
+
+    def create(self, kind, story_id, owner=None, max_queued=None, max_queued_per_owner=None):
+        """Insert a queued job, raising QueueFull if max_queued jobs in all, or
+        max_queued_per_owner of this owner's, are already waiting"""
+        now = datetime.now().isoformat()
+        job_id = str(uuid.uuid4())
+        with self.db.transaction() as conn:
+            if max_queued is not None:
+                queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= max_queued:
+                    raise QueueFull(f"{queued} jobs already queued")
+            if max_queued_per_owner is not None:
+                queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND owner IS ?",
+                                      (owner,)).fetchone()[0]
+                if queued >= max_queued_per_owner:
+                    raise QueueFull(f"{queued} jobs already queued for {owner}")
+            conn.execute(
+                "INSERT INTO jobs (id, kind, story_id, owner, status, submitted_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, story_id, owner, now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id):
+        row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job_from_row(row) if row else None
+
+    def claim_next(self, per_owner=None):
+        """Atomically move a queued job to running and return it
+
+        Owners take turns: the oldest job of the owner with the fewest running jobs is
+        claimed, skipping owners that already run per_owner jobs.
+        """
+        now = datetime.now().isoformat()
+        with self.db.transaction() as conn:
+            limit = "" if per_owner is None else f"AND COALESCE(running.jobs, 0) < {int(per_owner)} "
+            row = conn.execute(
+                "WITH running AS (SELECT owner, COUNT(*) AS jobs FROM jobs WHERE status = 'running' GROUP BY owner) "
+                "SELECT queued.id FROM jobs AS queued LEFT JOIN running ON running.owner IS queued.owner "
+                f"WHERE queued.status = 'queued' {limit}"
+                "ORDER BY COALESCE(running.jobs, 0), queued.submitted_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, updated_at = ? WHERE id = ?",
+                (now, now, row["id"])
+            )
+        return self.get(row["id"])
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = datetime.now().isoformat()
+        for field in ("progress", "result"):
+            if field in fields and fields[field] is not None:
+                fields[field] = json.dumps(fields[field])
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        self.db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+
+    def requeue_stale(self, older_than):
+        """Put running jobs abandoned by a crashed process back in the queue"""
+        cutoff = (datetime.now() - timedelta(seconds=older_than)).isoformat()
+        return self.db.execute(
+            "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+            (datetime.now().isoformat(), cutoff)
+        ).rowcount
+
+    def queued_count(self):
+        return self.db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+
+class JobQueue:
+    def __init__(self, runner, store, workers=None, max_queued=None, poll_interval=1.0, stale_after=None,
+                 per_owner=None, per_owner_queued=None):
+        # runner(job, report_progress) -> result dict, exceptions mark the job failed
+        self.runner = runner
+        self.store = store
+        self.workers = workers or int(os.environ.get("DREAMSCAPE_JOB_WORKERS", 4))
+        self.max_queued = max_queued or int(os.environ.get("DREAMSCAPE_JOB_QUEUE", 100))
+        # Per owner: jobs run at once, kept at the runner's own per-user limit so workers never
+        # sit waiting on it, and jobs left in the queue
+        self.per_owner = per_owner or int(os.environ.get("DREAMSCAPE_JOB_USER_CONCURRENCY", 2))
+        self.per_owner_queued = per_owner_queued or int(os.environ.get("DREAMSCAPE_JOB_USER_QUEUE", 10))
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after or float(os.environ.get("DREAMSCAPE_JOB_STALE_AFTER", 300))
+        self._wakeup = threading.Event()
+        self._changed = threading.Condition()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        after_fork(self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._wakeup = threading.Event()
+        self._changed = threading.Condition()
+        self._start_lock = threading.Lock()
+        was_running = bool(self._threads)
+        self._threads = []
+        if was_running:
+            self.start()
+
+    def start(self):
+        """Start the worker threads once, call it from serving processes only (not a preloading master)"""
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            # Jobs left running by a process that died before finishing them
+            self.store.requeue_stale(self.stale_after)
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, kind, story_id, owner=None):
+        """Persist a new job and wake a worker, raises QueueFull under backpressure"""
+        job = self.store.create(kind, story_id, owner, max_queued=self.max_queued,
+                                max_queued_per_owner=self.per_owner_queued)
+        self._wakeup.set()
+        return job
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _report_progress(self, job_id, progress):
+        self.store.update(job_id, progress=progress)
+        self._notify()
+
+    def _work(self):
+        idle_since = time.monotonic()
+        while True:
+            try:
+                if self._work_once():
+                    idle_since = time.monotonic()
+                    continue
+                if time.monotonic() - idle_since > self.stale_after:
+                    self.store.requeue_stale(self.stale_after)
+                    idle_since = time.monotonic()
+            except Exception as e:
+                # A failing store must not silently kill the worker, retry after a pause
+                print(f"Job worker failed: {e}")
+            # Another process may have queued work, so poll as well as wait
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _work_once(self):
+        """Claim and run one job, returns False when none can be claimed"""
+        job = self.store.claim_next(self.per_owner)
+        if job is None:
+            return False
+
+        self._notify()
+        try:
+            result = self.runner(job, lambda progress: self._report_progress(job["id"], progress))
+            self.store.update(job["id"], status="completed", result=result,
+                              finished_at=datetime.now().isoformat())
+        except Exception as e:
+            self.store.update(job["id"], status="failed", error=str(e),
+                              finished_at=datetime.now().isoformat())
+        finally:
+            # A job of an owner that was at its limit may be claimable now
+            self._wakeup.set()
+            self._notify()
+        return True
+
+    def wait_for_change(self, job_id, last_updated, timeout):
+        """Block until the job's updated_at differs from last_updated or timeout passes"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.store.get(job_id)
+            if job is None or job["updated_at"] != last_updated:
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            # Local updates wake us at once, updates from other processes within a poll interval
+            with self._changed:
+                self._changed.wait(min(remaining, self.poll_interval))
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "per_owner": self.per_owner,
+            "per_owner_queued": self.per_owner_queued,
+            "queued": self.store.queued_count()
+        }
@@ -0,0 +1,173 @@
+"""
+Conference Scheduler - fair sharing of agent execution between users
+Work waits for a slot before running. Slots are granted by weighted fair queuing
+across users, capped per user and globally, with interactive requests always ahead
+of bulk re-analysis and bulk work limited to part of the global budget so it can
+never occupy every slot. Limits apply per worker process.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from utils.fork import after_fork
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+
+class SchedulerBusy(Exception):
+    """Raised when a user has too much work waiting or a slot is not granted in time"""
+
+
+class _Ticket:
+    __slots__ = ("user", "lane", "granted", "cancelled")
+
+    def __init__(self, user, lane):
+        self.user = user
+        self.lane = lane
+        self.granted = False
+        self.cancelled = False
+
+
+class FairScheduler:
+    def __init__(self, max_concurrent=None, per_user=None, bulk_concurrent=None, per_user_queue=None,
+                 max_wait=None):
+        self.max_concurrent = max_concurrent or int(os.environ.get("DREAMSCAPE_SCHED_CONCURRENCY", 8))
+        self.per_user = per_user or int(os.environ.get("DREAMSCAPE_SCHED_USER_CONCURRENCY", 2))
+        self.bulk_concurrent = bulk_concurrent or int(os.environ.get(
+            "DREAMSCAPE_SCHED_BULK_CONCURRENCY", max(1, self.max_concurrent // 2)))
+        self.per_user_queue = per_user_queue or int(os.environ.get("DREAMSCAPE_SCHED_USER_QUEUE", 10))
+        self.max_wait = max_wait or float(os.environ.get("DREAMSCAPE_SCHED_MAX_WAIT", 30))
+        self._weights = {}
+        self._reset()
+        after_fork(self._reset)
+
+    def _reset(self):
+        self._cond = threading.Condition()
+        # Per lane heap of (virtual finish time, sequence, ticket)
+        self._queues = {lane: [] for lane in LANES}
+        self._virtual_time = {lane: 0.0 for lane in LANES}
+        self._last_finish = {}    # (lane, user) -> virtual finish time of their latest ticket
+        self._running = {lane: 0 for lane in LANES}
+        self._running_by_user = {}
+        self._waiting_by_user = {}
+        self._sequence = itertools.count()
+        self.granted = {lane: 0 for lane in LANES}
+        self.rejected = 0
+
+    def set_weight(self, user, weight):
+        """Give a user a larger (or smaller) share, the default weight is 1"""
+        with self._cond:
+            self._weights[user] = weight
+
+    def _eligible(self, ticket):
+        if self._running_by_user.get(ticket.user, 0) >= self.per_user:
+            return False
+        return ticket.lane != BULK or self._running[BULK] < self.bulk_concurrent
+
+    def _dispatch(self):
+        """Grant slots while any are free (caller holds the lock)"""
+        while sum(self._running.values()) < self.max_concurrent:
+            chosen = None
+            for lane in LANES:
+                queue = self._queues[lane]
+                # Drop cancelled tickets from the front, then scan in fair order
+                while queue and queue[0][2].cancelled:
+                    heapq.heappop(queue)
+                for entry in sorted(queue):
+                    if not entry[2].cancelled and self._eligible(entry[2]):
+                        chosen = (lane, entry)
+                        break
+                if chosen:
+                    break
+            if chosen is None:
+                return
+            lane, entry = chosen
+            self._queues[lane].remove(entry)
+            heapq.heapify(self._queues[lane])
+            ticket = entry[2]
+            ticket.granted = True
+            self._virtual_time[lane] = max(self._virtual_time[lane], entry[0])
+            self._running[lane] += 1
+            self._running_by_user[ticket.user] = self._running_by_user.get(ticket.user, 0) + 1
+            self._waiting_by_user[ticket.user] -= 1
+            self.granted[lane] += 1
+            self._cond.notify_all()
+
+    def _forget_if_idle(self, user):
+        """Drop the state of a user with nothing running or waiting (caller holds the lock)"""
+        if self._waiting_by_user.get(user) or user in self._running_by_user:
+            return
+        self._waiting_by_user.pop(user, None)
+        # Idle users start again from the current virtual time
+        for lane in LANES:
+            self._last_finish.pop((lane, user), None)
+
+    def acquire(self, user, lane=INTERACTIVE, cost=1.0, timeout=None):
+        """Wait for a slot, returns a ticket to pass to release()"""
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+        timeout = self.max_wait if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self._waiting_by_user.get(user, 0) >= self.per_user_queue:
+                self.rejected += 1
+                raise SchedulerBusy(f"Too many requests waiting for {user}")
+
+            ticket = _Ticket(user, lane)
+            # Weighted fair queuing: a user's work is spaced out in virtual time by cost / weight
+            start = max(self._virtual_time[lane], self._last_finish.get((lane, user), 0.0))
+            finish = start + cost / self._weights.get(user, 1.0)
+            self._last_finish[lane, user] = finish
+            heapq.heappush(self._queues[lane], (finish, next(self._sequence), ticket))
+            self._waiting_by_user[user] = self._waiting_by_user.get(user, 0) + 1
+            self._dispatch()
+
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    ticket.cancelled = True
+                    self._waiting_by_user[user] -= 1
+                    self._forget_if_idle(user)
+                    self.rejected += 1
+                    raise SchedulerBusy(f"No slot for {user} within {timeout:g}s")
+                self._cond.wait(remaining)
+            return ticket
+
+    def release(self, ticket):
+        with self._cond:
+            self._running[ticket.lane] -= 1
+            self._running_by_user[ticket.user] -= 1
+            if not self._running_by_user[ticket.user]:
+                del self._running_by_user[ticket.user]
+            self._forget_if_idle(ticket.user)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, user, lane=INTERACTIVE, cost=1.0, timeout=None):
+        ticket = self.acquire(user, lane, cost, timeout)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "per_user": self.per_user,
+                "bulk_concurrent": self.bulk_concurrent,
+                "running": dict(self._running),
+                "waiting": {lane: sum(1 for entry in queue if not entry[2].cancelled)
+                            for lane, queue in self._queues.items()},
+                "active_users": len(self._running_by_user),
+                "granted": dict(self.granted),
+                "rejected": self.rejected
+            }
+
+
+# Global instance
+conference_scheduler = FairScheduler()
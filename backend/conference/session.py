@@ -0,0 +1,100 @@
+"""
+Conference Sessions - per-conference state for agent discussions
+Every conference owns its story snapshot and round history, so concurrent
+conferences never share mutable state. Idle conferences are kept in a bounded
+in-memory store and dropped after a TTL or when the store is full.
+"""
+import copy
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+
+class ConferenceState:
+    def __init__(self, story_data, conference_id=None):
+        self.id = conference_id or str(uuid.uuid4())
+        # Snapshot so later edits to the story do not leak into a running conference
+        self.story = copy.deepcopy(story_data)
+        self.story_id = story_data.get("id")
+        self.created_at = datetime.now().isoformat()
+        self.rounds = []
+        self._lock = threading.Lock()
+
+    @property
+    def current_round(self):
+        return len(self.rounds)
+
+    def record(self, result):
+        """Append a round result, ignoring rounds another request already recorded"""
+        with self._lock:
+            if result["round"] == len(self.rounds) + 1:
+                self.rounds.append(result)
+
+    def agent_outputs(self):
+        """Every agent contribution so far, keyed by round"""
+        return {result["round"]: result["agent_contributions"] for result in self.rounds}
+
+    def to_dict(self):
+        return {
+            "conference_id": self.id,
+            "story_id": self.story_id,
+            "created_at": self.created_at,
+            "current_round": self.current_round,
+            "rounds": list(self.rounds)
+        }
+
+
+class ConferenceStore:
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or int(os.environ.get("DREAMSCAPE_CONFERENCE_MAX", 1000))
+        self.ttl = ttl or float(os.environ.get("DREAMSCAPE_CONFERENCE_TTL", 1800))
+        self._conferences = OrderedDict()   # conference_id -> (state, last access)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _evict(self, now):
+        # Caller holds the lock, entries are kept in last-access order
+        while self._conferences:
+            conference_id, (_, accessed) = next(iter(self._conferences.items()))
+            if len(self._conferences) <= self.max_entries and now - accessed < self.ttl:
+                break
+            del self._conferences[conference_id]
+            self.evictions += 1
+
+    def create(self, story_data):
+        state = ConferenceState(story_data)
+        now = time.monotonic()
+        with self._lock:
+            self._conferences[state.id] = (state, now)
+            self._evict(now)
+        return state
+
+    def get(self, conference_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._conferences.get(conference_id)
+            if entry is None:
+                return None
+            if now - entry[1] >= self.ttl:
+                del self._conferences[conference_id]
+                self.evictions += 1
+                return None
+            self._conferences[conference_id] = (entry[0], now)
+            self._conferences.move_to_end(conference_id)
+            return entry[0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "conferences": len(self._conferences),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "evictions": self.evictions
+            }
+
+
+# Global instance
+conference_store = ConferenceStore()
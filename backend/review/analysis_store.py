@@ -0,0 +1,58 @@
+"""
+Analysis Store - the latest agent contributions of every story
+Each contribution is saved with the fingerprint of the agent inputs it was computed
+from (agent, version, method and the story fields it reads), so after an edit only
+contributions whose fingerprint changed need to be recomputed
+"""
+import json
+from datetime import datetime
+from utils.sqlite import LocalSQLite
+
+
+class AnalysisStore:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS story_analysis (
+            story_id TEXT NOT NULL,
+            contribution TEXT NOT NULL,
+            agent TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            value TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (story_id, contribution)
+        );
+    """
+
+    def __init__(self, db_path):
+        self.db = LocalSQLite(db_path, self.SCHEMA)
+
+    def get(self, story_id):
+        """{contribution: {agent, fingerprint, value, updated_at}} for one story"""
+        rows = self.db.execute(
+            "SELECT contribution, agent, fingerprint, value, updated_at FROM story_analysis WHERE story_id = ?",
+            (story_id,)
+        ).fetchall()
+        return {
+            row["contribution"]: {
+                "agent": row["agent"],
+                "fingerprint": row["fingerprint"],
+                "value": json.loads(row["value"]),
+                "updated_at": row["updated_at"]
+            }
+            for row in rows
+        }
+
+    def save(self, story_id, entries):
+        """Upsert {contribution: (agent_name, fingerprint, value)} in one transaction"""
+        if not entries:
+            return
+        now = datetime.now().isoformat()
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO story_analysis "
+                "(story_id, contribution, agent, fingerprint, value, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(story_id, contribution, agent_name, fingerprint, json.dumps(value), now)
+                 for contribution, (agent_name, fingerprint, value) in entries.items()]
+            )
+
+    def delete(self, story_id):
+        self.db.execute("DELETE FROM story_analysis WHERE story_id = ?", (story_id,))
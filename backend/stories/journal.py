@@ -0,0 +1,299 @@
+"""
+Story Journal - append-only story log with background snapshot compaction
+Every write is a single appended line, reads are served from an in-memory index
+Appends and compactions hold a file lock, so several worker processes can share
+one journal; each process tails the journal to pick up the others' writes
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from utils.filelock import FileLock
+from utils.pagination import decode_cursor, encode_cursor, story_matches
+from utils.fork import after_fork
+
+
+class StoryJournal:
+    def __init__(self, data_dir, compact_every=None, fsync=None):
+        # The snapshot keeps the legacy stories.json layout (story id -> story)
+        self.snapshot_file = os.path.join(data_dir, "stories.json")
+        self.journal_file = os.path.join(data_dir, "stories.journal")
+        self.compact_every = compact_every or int(os.environ.get("DREAMSCAPE_JOURNAL_COMPACT_EVERY", 1000))
+        if fsync is None:
+            fsync = os.environ.get("DREAMSCAPE_JOURNAL_FSYNC", "1") == "1"
+        self.fsync = fsync
+
+        os.makedirs(data_dir, exist_ok=True)
+        self._stories = {}
+        # username -> [(created_at, story id)] kept sorted for cursor pagination
+        self._by_user = {}
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(self.journal_file + ".lock")
+        # Held for a whole compaction so only one process compacts at a time
+        self._compact_lock = FileLock(self.journal_file + ".compact.lock")
+        self._pending = 0
+        self._compactor = None
+        # Snapshot loaded, plus identity and read position of the journal tailed on top of it
+        self._snapshot_version = None
+        self._inode = None
+        self._offset = 0
+        after_fork(self._reset_after_fork)
+        with self._file_lock:
+            self.load()
+
+    def _reset_after_fork(self):
+        self._lock = threading.RLock()
+        self._compactor = None
+
+    def load(self):
+        """Rebuild the index from the last snapshot plus every journal tail"""
+        with self._lock:
+            self._snapshot_version = self._file_version(self.snapshot_file)
+            try:
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    self._stories = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._stories = {}
+
+            self._by_user = {}
+            for story in self._stories.values():
+                self._by_user.setdefault(story.get("username", ""), []).append(self._index_key(story))
+            for keys in self._by_user.values():
+                keys.sort()
+
+            # Rotated journals belong to a compaction that has not finished yet
+            self._pending = 0
+            for path in self._rotated_journals():
+                with open(path, 'rb') as f:
+                    self._pending += self._apply(f.read())
+
+            # The journal always exists, so a compaction elsewhere always changes its inode
+            open(self.journal_file, 'ab').close()
+            self._inode = None
+            self._offset = 0
+            self._tail()
+
+    def _rotated_journals(self):
+        return sorted(glob.glob(self.journal_file + ".*[0-9]"))
+
+    def _file_version(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _apply(self, data):
+        applied = 0
+        for line in data.splitlines():
+            try:
+                story = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn final line from a crash mid-append
+                continue
+            self._index(story)
+            applied += 1
+        return applied
+
+    def _index_key(self, story):
+        return (story.get("created_at", ""), story["id"])
+
+    def _index(self, story):
+        """Store a story and keep the per-user index in step"""
+        previous = self._stories.get(story["id"])
+        if previous is not None:
+            if (previous.get("username", ""), self._index_key(previous)) == \
+                    (story.get("username", ""), self._index_key(story)):
+                self._stories[story["id"]] = story
+                return
+            keys = self._by_user.get(previous.get("username", ""), [])
+            position = bisect.bisect_left(keys, self._index_key(previous))
+            if position < len(keys) and keys[position] == self._index_key(previous):
+                del keys[position]
+
+        self._stories[story["id"]] = story
+        # Stories mostly arrive in created_at order, so this is usually an append
+        bisect.insort(self._by_user.setdefault(story.get("username", ""), []), self._index_key(story))
+
+    def _tail(self):
+        """Apply journal lines appended since the last read (caller holds the locks)"""
+        try:
+            with open(self.journal_file, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if self._inode is not None and (
+                        stat.st_ino != self._inode or stat.st_size < self._offset
+                        or self._file_version(self.snapshot_file) != self._snapshot_version):
+                    # Another process compacted: its snapshot plus the new journal are authoritative
+                    stale = True
+                else:
+                    stale = False
+                    self._inode = stat.st_ino
+                    f.seek(self._offset)
+                    data = f.read()
+        except FileNotFoundError:
+            # Removed from outside, start over from the snapshot
+            stale = True
+
+        if stale:
+            self.load()
+            return
+
+        # Only consume complete lines
+        end = data.rfind(b"\n") + 1
+        self._pending += self._apply(data[:end])
+        self._offset += end
+
+    def refresh(self):
+        """Pick up writes made by other processes since the last call"""
+        try:
+            stat = os.stat(self.journal_file)
+            if stat.st_ino == self._inode and stat.st_size == self._offset:
+                return
+        except FileNotFoundError:
+            if self._inode is None:
+                return
+
+        with self._lock, self._file_lock:
+            self._tail()
+
+    def get_story(self, story_id):
+        # Always refresh (one stat when nothing changed), a cached story may have been edited elsewhere
+        self.refresh()
+        return self._stories.get(story_id)
+
+    def get_stories(self, story_ids):
+        """Look up many stories at once, returns {story_id: story} for the ids that exist"""
+        self.refresh()
+        with self._lock:
+            return {story_id: self._stories[story_id] for story_id in story_ids if story_id in self._stories}
+
+    def list_user_stories(self, username, limit=20, after=None, genre=None, status=None):
+        """One page of a user's stories, newest first, as (stories, next_cursor)"""
+        self.refresh()
+        with self._lock:
+            keys = self._by_user.get(username, [])
+            position = bisect.bisect_left(keys, decode_cursor(after)) if after else len(keys)
+
+            stories = []
+            while position > 0 and len(stories) <= limit:
+                position -= 1
+                story = self._stories[keys[position][1]]
+                if story_matches(story, genre, status):
+                    stories.append(story)
+
+        next_cursor = encode_cursor(stories[limit - 1]) if len(stories) > limit else None
+        return stories[:limit], next_cursor
+
+    def add_story(self, story):
+        """Append a new story, returns False if the id already exists"""
+        return self.add_stories([story])[0]
+
+    def add_stories(self, stories):
+        """Append several stories with a single write (and fsync)"""
+        with self._lock, self._file_lock:
+            self._tail()
+            results = []
+            accepted = []
+            seen = set()
+            for story in stories:
+                fresh = story["id"] not in self._stories and story["id"] not in seen
+                results.append(fresh)
+                if fresh:
+                    seen.add(story["id"])
+                    accepted.append(story)
+            if not accepted:
+                return results
+            needs_compaction = self._append(accepted)
+
+        if needs_compaction:
+            self.compact_in_background()
+        return results
+
+    def update_story(self, story_id, fields):
+        """Append the updated version of a story, returns it or None if it does not exist"""
+        with self._lock, self._file_lock:
+            self._tail()
+            current = self._stories.get(story_id)
+            if current is None:
+                return None
+            story = dict(current, **fields)
+            needs_compaction = self._append([story])
+
+        if needs_compaction:
+            self.compact_in_background()
+        return story
+
+    def _append(self, stories):
+        """Write story versions as one append and index them (caller holds the locks)
+
+        Returns True when enough lines have accumulated to compact
+        """
+        data = "".join(json.dumps(story, separators=(",", ":")) + "\n" for story in stories).encode("utf-8")
+        with open(self.journal_file, 'ab') as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            self._inode = os.fstat(f.fileno()).st_ino
+        self._offset += len(data)
+        for story in stories:
+            self._index(story)
+        self._pending += len(stories)
+        return self._pending >= self.compact_every
+
+    def iter_stories(self, batch_size=500):
+        """Yield every story from a point-in-time list of ids"""
+        self.refresh()
+        with self._lock:
+            story_ids = list(self._stories)
+        for story_id in story_ids:
+            story = self._stories.get(story_id)
+            if story is not None:
+                yield story
+
+    def compact_in_background(self):
+        """Start a compaction thread unless one is already running"""
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, name="story-journal-compactor",
+                                               daemon=True)
+            self._compactor.start()
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot"""
+        with self._compact_lock:
+            self._compact()
+
+    def _compact(self):
+        with self._lock, self._file_lock:
+            self._tail()
+            if not self._pending:
+                return
+            # Rotate the journal so appends continue while the snapshot is written
+            rotated = f"{self.journal_file}.{time.time_ns()}"
+            os.replace(self.journal_file, rotated)
+            with open(self.journal_file, 'ab') as f:
+                self._inode = os.fstat(f.fileno()).st_ino
+            self._offset = 0
+            snapshot = dict(self._stories)
+            self._pending = 0
+
+        tmp_file = self.snapshot_file + ".compacting"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock, self._file_lock:
+            os.replace(tmp_file, self.snapshot_file)
+            self._snapshot_version = self._file_version(self.snapshot_file)
+            # Everything up to and including this rotation is now in the snapshot
+            for path in self._rotated_journals():
+                if path <= rotated:
+                    os.remove(path)
+
+    def close(self):
+        self.compact()
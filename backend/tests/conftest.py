@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The app opens its storage at import, so point it at a throwaway directory first
+os.environ["DREAMSCAPE_DATA_DIR"] = tempfile.mkdtemp(prefix="dreamscape-test-")
+os.environ.setdefault("DREAMSCAPE_SCRYPT_N", "1024")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_story(client):
+    def make(username="alice", **fields):
+        payload = {"title": "The Great Adventure", "genre": "Fantasy", "mood": "Exciting",
+                   "idea": "Explorers find a hidden world under the ocean", "username": username}
+        payload.update(fields)
+        return client.post("/api/story/create", json=payload).get_json()["story"]
+    return make
+
+
+@pytest.fixture
+def login(client):
+    def login(username):
+        client.post("/api/auth/register", json={"username": username, "password": "secret-password",
+                                                "email": f"{username}@example.com"})
+        return client.post("/api/auth/login", json={"username": username,
+                                                    "password": "secret-password"}).get_json()["session_id"]
+    return login
@@ -0,0 +1,47 @@
+import time
+from agents.analysis_cache import AnalysisCache
+from agents.conference_manager import ConferenceManager
+from agents.registry import agent_registry
+
+
+def test_batch_rejects_ids_that_are_not_strings(client, make_story):
+    story_id = make_story()["id"]
+
+    for story_ids in ([story_id, 42], [story_id, ""], [story_id, ["nested"]], [None]):
+        response = client.post("/api/story/analyze/batch", json={"story_ids": story_ids})
+        assert response.status_code == 400, story_ids
+
+
+def test_deadline_starts_when_the_agent_runs():
+    # One pool thread, so the second agent waits for the first before it starts
+    manager = ConferenceManager(max_workers=1, cache=AnalysisCache())
+    agent = agent_registry.agents()[0]
+
+    def first(story):
+        time.sleep(0.4)
+        return {"agent": agent.agent_name}
+
+    def second(story):
+        time.sleep(0.3)
+        return {"agent": agent.agent_name}
+
+    results = manager._compute({"first": (agent, first, {}), "second": (agent, second, {})},
+                               {agent.agent_name: 0.5})
+
+    assert results == {"first": {"agent": agent.agent_name}, "second": {"agent": agent.agent_name}}
+
+
+def test_analysis_reports_missing_and_stale_separately(client, make_story):
+    story_id = make_story()["id"]
+
+    fresh = client.get(f"/api/story/{story_id}/analysis").get_json()
+    assert fresh["stale_contributions"] == []
+    assert "plot_analysis" in fresh["missing_contributions"]
+
+    client.post("/api/story/analyze/batch", json={"story_ids": [story_id]})
+    edited = client.patch(f"/api/story/{story_id}", json={"idea": "A lighthouse keeper hears the sea talk"}).get_json()
+
+    assert edited["stale_contributions"] == ["character_development"]
+    assert "plot_analysis" not in edited["missing_contributions"]
+    # Round 2 was never run in the batch
+    assert "plot_twist" in edited["missing_contributions"]
@@ -0,0 +1,34 @@
+import json
+
+
+def stream(client, payload):
+    response = client.post("/api/story/analyze/stream", json=payload)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_sends_every_round_then_done(client, make_story):
+    events = stream(client, {"story_id": make_story()["id"]})
+
+    assert [event["type"] for event in events] == ["round", "round", "round", "done"]
+    assert events[-1]["completed_rounds"] == [1, 2, 3]
+
+
+def test_resume_continues_after_last_completed_round(client, make_story):
+    first = stream(client, {"story_id": make_story()["id"], "max_rounds": 1})
+    conference_id = first[-1]["conference_id"]
+
+    resumed = stream(client, {"conference_id": conference_id})
+
+    assert [event.get("round") for event in resumed if event["type"] == "round"] == [2, 3]
+
+
+def test_resume_after_completion_only_sends_done(client, make_story):
+    events = stream(client, {"story_id": make_story()["id"]})
+    final = events[-2]["analysis"]
+
+    resumed = stream(client, {"conference_id": events[-1]["conference_id"]})
+
+    assert [event["type"] for event in resumed] == ["done"]
+    assert resumed[0]["completed_rounds"] == []
+    assert resumed[0]["analysis"] == final
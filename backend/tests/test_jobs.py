@@ -0,0 +1,18 @@
+import pytest
+from conference.jobs import JobStore, QueueFull
+
+
+def test_jobs_are_claimed_in_turn_by_owner(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    for _ in range(3):
+        store.create("analysis", "story", owner="busy")
+    store.create("analysis", "story", owner="quiet")
+
+    owners = [store.claim_next(per_owner=2)["owner"] for _ in range(3)]
+
+    assert sorted(owners) == ["busy", "busy", "quiet"]
+    # Busy runs two already, its third job waits
+    assert store.claim_next(per_owner=2) is None
+    with pytest.raises(QueueFull):
+        store.create("analysis", "story", owner="busy", max_queued_per_owner=1)
+    store.create("analysis", "story", owner="quiet", max_queued_per_owner=1)
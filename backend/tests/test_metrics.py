@@ -0,0 +1,37 @@
+import time
+from utils.metrics import Metrics, time_methods
+
+
+class Store:
+    def rows(self):
+        for row in range(3):
+            time.sleep(0.02)
+            yield row
+
+
+def test_generators_are_timed_until_exhausted():
+    registry = Metrics()
+    seconds = registry.histogram("test_seconds", "Call time", ("method",))
+    errors = registry.counter("test_errors_total", "Call errors", ("method",))
+    store = Store()
+    time_methods(store, ("rows",), seconds, errors)
+
+    assert list(store.rows()) == [0, 1, 2]
+
+    _, total, count = seconds._values["rows",]
+    assert count == 1
+    assert total >= 0.06
+
+
+def test_closed_generators_are_timed_once():
+    registry = Metrics()
+    seconds = registry.histogram("test_seconds", "Call time", ("method",))
+    errors = registry.counter("test_errors_total", "Call errors", ("method",))
+    store = Store()
+    time_methods(store, ("rows",), seconds, errors)
+
+    rows = store.rows()
+    next(rows)
+    rows.close()
+
+    assert seconds._values["rows",][2] == 1
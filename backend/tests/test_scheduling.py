@@ -0,0 +1,80 @@
+import functools
+import threading
+import time
+import uuid
+import pytest
+from agents.registry import agent_registry
+from conference.scheduler import FairScheduler, SchedulerBusy
+
+
+def test_sessions_behind_one_address_get_separate_shares(app, login):
+    from app import scheduler_user
+
+    alice, bob = login("share_alice"), login("share_bob")
+    with app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        users = [scheduler_user({"session_id": alice}), scheduler_user({"session_id": bob})]
+    assert users[0] != users[1]
+
+    scheduler = FairScheduler(max_concurrent=4, per_user=1)
+    held = scheduler.acquire(users[0])
+    # Alice is at her limit, Bob still gets a slot of his own
+    with pytest.raises(SchedulerBusy):
+        scheduler.acquire(users[0], timeout=0.1)
+    scheduler.release(scheduler.acquire(users[1], timeout=0.1))
+    scheduler.release(held)
+
+
+def test_trusted_client_header_separates_callers(app, monkeypatch):
+    from app import scheduler_user
+
+    monkeypatch.setenv("DREAMSCAPE_CLIENT_HEADER", "X-DreamScape-Client")
+    keys = set()
+    for client_id in ("browser-a", "browser-b"):
+        with app.test_request_context(headers={"X-DreamScape-Client": client_id},
+                                      environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+            keys.add(scheduler_user({}))
+    assert len(keys) == 2
+
+
+def test_timed_out_user_leaves_no_scheduler_state():
+    scheduler = FairScheduler(max_concurrent=1, per_user=1)
+    held = scheduler.acquire("owner")
+
+    with pytest.raises(SchedulerBusy):
+        scheduler.acquire("waiter", timeout=0.05)
+    scheduler.release(held)
+
+    assert scheduler._last_finish == {}
+    assert scheduler._waiting_by_user == {}
+
+
+@pytest.fixture
+def slow_agents(monkeypatch):
+    """Every round 1 agent method takes 50ms, as if it called a model"""
+    for agent, method in agent_registry.round_tasks(1).values():
+        @functools.wraps(method)
+        def slow(story_data, method=method):
+            time.sleep(0.05)
+            return method(story_data)
+        monkeypatch.setattr(agent, method.__name__, slow)
+
+
+def test_interactive_request_stays_fast_during_a_batch(app, client, make_story, login, slow_agents):
+    run = uuid.uuid4().hex
+    story_ids = [make_story(title=f"Batch {run} {index}", idea=f"Batch idea {run} {index}")["id"]
+                 for index in range(150)]
+    batch = threading.Thread(target=lambda: app.test_client().post(
+        "/api/story/analyze/batch", json={"story_ids": story_ids}))
+    batch.start()
+    time.sleep(0.2)
+
+    story_id = make_story(title=f"Interactive {run}", idea=f"Interactive idea {run}")["id"]
+    started = time.perf_counter()
+    response = client.post("/api/story/analyze", json={"story_id": story_id, "session_id": login("interactive")})
+    elapsed = time.perf_counter() - started
+    still_running = batch.is_alive()
+    batch.join()
+
+    assert response.status_code == 200
+    assert still_running
+    assert elapsed < 0.5
@@ -0,0 +1,15 @@
+"""
+Fork safety for per-process state
+Threads, thread pools, HTTP sessions and locks held by other threads do not survive
+fork, so a gunicorn worker forked from a preloading master would inherit them in an
+unusable state. Objects owning such state register a reset with after_fork() and
+every process rebuilds its own. Background threads are started lazily by the
+serving process (see app.py) rather than at import, so the master runs none.
+"""
+import os
+
+
+def after_fork(reset):
+    """Call reset() in the child after every fork, a no-op where fork does not exist"""
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=reset)
@@ -0,0 +1,106 @@
+"""
+HTTP caching and compression for JSON responses
+Read endpoints get strong ETags, from record versions where a view knows them or
+from the body otherwise, and If-None-Match answers 304. Large bodies are
+compressed with brotli (when installed) or gzip according to Accept-Encoding.
+Streamed responses (NDJSON, server-sent events) are left untouched.
+"""
+import gzip
+import hashlib
+import json
+import os
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/csv")
+
+
+def etag_for(*parts):
+    """Strong ETag value for a record version, e.g. etag_for("job", job_id, updated_at)"""
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:32]
+
+
+def _requested_tags():
+    header = request.headers.get("If-None-Match", "")
+    tags = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        # Compressed representations carry an encoding suffix on the same version
+        for suffix in ("-gzip", "-br"):
+            if tag.endswith(suffix):
+                tag = tag[:-len(suffix)]
+        if tag:
+            tags.add(tag)
+    return tags
+
+
+def client_has(etag):
+    tags = _requested_tags()
+    return etag in tags or "*" in tags
+
+
+def not_modified(etag):
+    """A 304 response if the client already has this version, otherwise None
+
+    Lets a view skip building the body when the version is known up front
+    """
+    if request.method not in ("GET", "HEAD") or not client_has(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _accepted_encoding():
+    for encoding in (("br",) if brotli is not None else ()) + ("gzip",):
+        if request.accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def install(app, min_size=None, level=None):
+    """Register the ETag and compression hook on a Flask app"""
+    min_size = min_size or int(os.environ.get("DREAMSCAPE_COMPRESS_MIN_BYTES", 1024))
+    level = level or int(os.environ.get("DREAMSCAPE_COMPRESS_LEVEL", 6))
+
+    @app.after_request
+    def cache_and_compress(response):
+        if response.is_streamed or response.direct_passthrough or response.status_code != 200:
+            return response
+        if response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+
+        if request.method in ("GET", "HEAD"):
+            etag, _ = response.get_etag()
+            if etag is None:
+                etag = hashlib.sha256(response.get_data()).hexdigest()[:32]
+                response.set_etag(etag)
+            if client_has(etag):
+                return not_modified(etag)
+
+        response.vary.add("Accept-Encoding")
+        if "Content-Encoding" in response.headers or response.content_length is None \
+                or response.content_length < min_size:
+            return response
+        encoding = _accepted_encoding()
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=min(level, 11))
+        else:
+            compressed = gzip.compress(data, compresslevel=min(level, 9))
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        etag, _ = response.get_etag()
+        if etag is not None:
+            response.set_etag(f"{etag}-{encoding}")
+        return response
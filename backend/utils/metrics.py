@@ -0,0 +1,273 @@
+"""
+Metrics for DreamScape in the Prometheus text format
+Counters, gauges and fixed-bucket histograms kept in memory, cheap enough to
+record on every request (one lock and a bisect per observation). install() adds
+per-route request timing to a Flask app, time_methods() times the calls of an
+object such as a storage engine, and collectors turn existing stats() dicts into
+gauges at scrape time. Values are per worker process, like the scheduler limits.
+"""
+import bisect
+import functools
+import inspect
+import threading
+import time
+from utils.fork import after_fork
+
+# Seconds, from a cached lookup to a slow agent conference
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STORAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+                                for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket (not cumulative) counts, then sum and count
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, ('le', _number(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Metrics:
+    """Registry of metrics and scrape-time collectors"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        after_fork(self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # Each worker process reports its own traffic from zero
+        self._lock = threading.Lock()
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=REQUEST_BUCKETS):
+        return self._register(Histogram, name, help_text, labelnames, buckets)
+
+    def register_collector(self, collector):
+        """collector() yields (name, kind, help, [(labels dict, value), ...]) at every scrape"""
+        self._collectors.append(collector)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                collected = list(collector())
+            except Exception:
+                # A broken stats source must not take the whole scrape down
+                self.counter("dreamscape_metrics_collector_errors_total",
+                             "Collectors that raised during a scrape").inc()
+                continue
+            for name, kind, help_text, samples in collected:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _timed_iteration(generator, started, histogram, errors, labels):
+    try:
+        yield from generator
+    except Exception:
+        errors.inc(*labels)
+        raise
+    finally:
+        # Exhausted, closed or collected
+        histogram.observe(time.perf_counter() - started, *labels)
+
+
+def _timed(method, histogram, errors, labels):
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except Exception:
+            errors.inc(*labels)
+            histogram.observe(time.perf_counter() - started, *labels)
+            raise
+        if inspect.isgenerator(result):
+            return _timed_iteration(result, started, histogram, errors, labels)
+        histogram.observe(time.perf_counter() - started, *labels)
+        return result
+    return timed
+
+
+def time_methods(obj, method_names, histogram, errors, *labels):
+    """Replace obj's methods with timed wrappers, observed as (*labels, method name)
+
+    Methods the object does not have are skipped. Calls that raise are counted in
+    errors and re-raised. Generators are timed until they are exhausted or closed,
+    so the time includes whatever the caller does between items.
+    """
+    for method_name in method_names:
+        method = getattr(obj, method_name, None)
+        if method is not None:
+            setattr(obj, method_name, _timed(method, histogram, errors, labels + (method_name,)))
+
+
+def install(app, registry=None):
+    """Record latency, status counts and in-flight requests per route of a Flask app
+
+    Install before other after_request hooks (such as utils.http_cache) so the final
+    status and their work are included. Streamed responses are timed to their first
+    byte.
+    """
+    from flask import g, request
+
+    registry = registry or metrics
+    duration = registry.histogram("dreamscape_http_request_duration_seconds",
+                                  "Time to produce a response, per route", ("method", "route"))
+    requests_total = registry.counter("dreamscape_http_requests_total",
+                                      "Responses sent, per route and status", ("method", "route", "status"))
+    in_flight = registry.gauge("dreamscape_http_requests_in_flight",
+                               "Requests being handled, per route", ("method", "route"))
+
+    @app.before_request
+    def start_request_timer():
+        # The URL rule, not the path, so ids do not explode the label set
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        g.metrics_request = (request.method, route, time.perf_counter())
+        in_flight.inc(request.method, route)
+
+    @app.after_request
+    def record_request(response):
+        started = g.get("metrics_request")
+        if started is not None:
+            method, route, started_at = started
+            duration.observe(time.perf_counter() - started_at, method, route)
+            requests_total.inc(method, route, str(response.status_code))
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        started = g.pop("metrics_request", None)
+        if started is not None:
+            in_flight.dec(started[0], started[1])
+
+
+# Global instance
+metrics = Metrics()
@@ -0,0 +1,29 @@
+"""
+Cursor pagination helpers shared by the storage engines
+Kept free of imports with side effects, so any store can use them
+"""
+import base64
+import json
+
+
+def encode_cursor(story):
+    """Opaque pagination cursor pointing just past a story"""
+    raw = json.dumps([story.get("created_at", ""), story["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor, raises ValueError on a malformed cursor"""
+    try:
+        created_at, story_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), str(story_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def story_matches(story, genre=None, status=None):
+    if genre and (story.get("genre") or "").lower() != genre.lower():
+        return False
+    if status and story.get("status") != status:
+        return False
+    return True
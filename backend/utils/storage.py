@@ -0,0 +1,680 @@
+"""
+Storage engines for DreamScape users, sessions and stories
+SQLite (WAL) is the default engine, the JSON engine keeps the legacy file layout
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from utils.filelock import FileLock, atomic_write_json
+from utils.pagination import decode_cursor, encode_cursor
+
+DATA_DIR = os.environ.get("DREAMSCAPE_DATA_DIR", "data")
+
+# Columns stored outside of the JSON `data` blob of a user row
+USER_COLUMNS = ("username", "email", "password_hash", "created_at", "last_login")
+SESSION_COLUMNS = ("username", "created_at", "last_active", "expires_at")
+
+# add_user outcomes
+USER_CREATED = "created"
+USERNAME_TAKEN = "username_taken"
+EMAIL_TAKEN = "email_taken"
+
+
+def normalize_email(email):
+    """Canonical form used by the email index"""
+    return email.strip().lower()
+
+
+def load_json_file(path):
+    """Load a JSON document, treating a missing or corrupt file as empty"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+class Storage:
+    """Interface every storage engine implements"""
+
+    def transaction(self):
+        """Group several writes into one atomic unit (no-op by default)"""
+        return nullcontext()
+
+    # Users
+    def get_user(self, username):
+        raise NotImplementedError
+
+    def add_user(self, user):
+        """Insert a new user, returns USER_CREATED, USERNAME_TAKEN or EMAIL_TAKEN"""
+        raise NotImplementedError
+
+    def update_user(self, username, fields):
+        raise NotImplementedError
+
+    def get_username_by_email(self, email):
+        """Look a username up through the case-insensitive email index"""
+        raise NotImplementedError
+
+    def add_users(self, users):
+        """Insert several users at once, returns one add_user outcome per user"""
+        with self.transaction():
+            return [self.add_user(user) for user in users]
+
+    def iter_users(self, batch_size=500):
+        """Yield every user record (including password_hash)"""
+        raise NotImplementedError
+
+    # Sessions
+    def get_session(self, session_id):
+        raise NotImplementedError
+
+    def add_session(self, session_id, session):
+        raise NotImplementedError
+
+    def update_session(self, session_id, fields):
+        raise NotImplementedError
+
+    def touch_sessions(self, last_active_by_session):
+        """Apply a batch of last_active updates"""
+        with self.transaction():
+            for session_id, last_active in last_active_by_session.items():
+                self.update_session(session_id, {"last_active": last_active})
+
+    def delete_session(self, session_id):
+        raise NotImplementedError
+
+    def delete_expired_sessions(self, now=None):
+        """Remove every session whose expires_at is in the past, returns the count"""
+        raise NotImplementedError
+
+    # Stories
+    def get_story(self, story_id):
+        raise NotImplementedError
+
+    def get_stories(self, story_ids):
+        """Look up many stories at once, returns {story_id: story} for the ids that exist"""
+        stories = {}
+        for story_id in story_ids:
+            story = self.get_story(story_id)
+            if story is not None:
+                stories[story_id] = story
+        return stories
+
+    def add_story(self, story):
+        """Insert a new story, returns False if the id already exists"""
+        raise NotImplementedError
+
+    def add_stories(self, stories):
+        """Insert several stories in one write, returns one add_story result per story"""
+        with self.transaction():
+            return [self.add_story(story) for story in stories]
+
+    def update_story(self, story_id, fields):
+        """Merge fields into a story, returns the updated story or None if it does not exist"""
+        raise NotImplementedError
+
+    def iter_stories(self, batch_size=500):
+        """Yield every story without materialising the whole collection"""
+        raise NotImplementedError
+
+    def list_user_stories(self, username, limit=20, after=None, genre=None, status=None):
+        """One page of a user's stories, newest first, as (stories, next_cursor)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage(Storage):
+    """SQLite storage in WAL mode with one connection per thread"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            email TEXT NOT NULL,
+            email_normalized TEXT,
+            password_hash TEXT NOT NULL,
+            created_at TEXT,
+            last_login TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            created_at TEXT,
+            last_active TEXT,
+            expires_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at);
+        CREATE INDEX IF NOT EXISTS idx_sessions_username ON sessions (username);
+        CREATE TABLE IF NOT EXISTS stories (
+            id TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            genre TEXT,
+            status TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_stories_username_created
+            ON stories (username, created_at, id);
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        self._migrate_email_index(conn)
+
+    def _migrate_email_index(self, conn):
+        """Add and backfill email_normalized on databases created before the email index"""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(users)")}
+        if "email_normalized" not in columns:
+            with self.transaction():
+                conn.execute("ALTER TABLE users ADD COLUMN email_normalized TEXT")
+                seen = set()
+                for row in conn.execute("SELECT rowid, email FROM users ORDER BY rowid").fetchall():
+                    email = normalize_email(row["email"])
+                    # Legacy duplicates keep a NULL key so the unique index can be built
+                    if email not in seen:
+                        seen.add(email)
+                        conn.execute("UPDATE users SET email_normalized = ? WHERE rowid = ?",
+                                     (email, row["rowid"]))
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email_normalized)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid != os.getpid():
+            # Inherited across fork: never reuse a parent's connection in a worker
+            conn = None
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction, nested calls join the outermost one"""
+        conn = self._connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    # Users
+    def _user_from_row(self, row):
+        user = json.loads(row["data"])
+        for column in USER_COLUMNS:
+            user[column] = row[column]
+        return user
+
+    def get_user(self, username):
+        row = self._connection().execute(
+            "SELECT * FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return self._user_from_row(row) if row else None
+
+    def add_user(self, user):
+        extra = {k: v for k, v in user.items() if k not in USER_COLUMNS}
+        email = normalize_email(user["email"])
+        # BEGIN IMMEDIATE holds the write lock, so both checks and the insert are atomic
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM users WHERE username = ?", (user["username"],)).fetchone():
+                return USERNAME_TAKEN
+            if conn.execute("SELECT 1 FROM users WHERE email_normalized = ?", (email,)).fetchone():
+                return EMAIL_TAKEN
+            conn.execute(
+                "INSERT INTO users (username, email, email_normalized, password_hash, created_at, last_login, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (user["username"], user["email"], email, user["password_hash"],
+                 user.get("created_at"), user.get("last_login"), json.dumps(extra))
+            )
+            return USER_CREATED
+
+    def update_user(self, username, fields):
+        with self.transaction() as conn:
+            row = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+            if row is None:
+                return False
+            user = self._user_from_row(row)
+            user.update(fields)
+            extra = {k: v for k, v in user.items() if k not in USER_COLUMNS}
+            conn.execute(
+                "UPDATE users SET email = ?, email_normalized = ?, password_hash = ?, created_at = ?, "
+                "last_login = ?, data = ? WHERE username = ?",
+                (user["email"], normalize_email(user["email"]), user["password_hash"],
+                 user.get("created_at"), user.get("last_login"), json.dumps(extra), username)
+            )
+            return True
+
+    def get_username_by_email(self, email):
+        row = self._connection().execute(
+            "SELECT username FROM users WHERE email_normalized = ?", (normalize_email(email),)
+        ).fetchone()
+        return row["username"] if row else None
+
+    def iter_users(self, batch_size=500):
+        # Keyset batches, so no read transaction stays open while the caller streams
+        last = ""
+        while True:
+            rows = self._connection().execute(
+                "SELECT * FROM users WHERE username > ? ORDER BY username LIMIT ?", (last, batch_size)
+            ).fetchall()
+            for row in rows:
+                yield self._user_from_row(row)
+            if len(rows) < batch_size:
+                return
+            last = rows[-1]["username"]
+
+    # Sessions
+    def get_session(self, session_id):
+        row = self._connection().execute(
+            "SELECT * FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return {column: row[column] for column in SESSION_COLUMNS} if row else None
+
+    def add_session(self, session_id, session):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, username, created_at, last_active, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (session_id, session["username"], session.get("created_at"),
+                 session.get("last_active"), session["expires_at"])
+            )
+
+    def update_session(self, session_id, fields):
+        columns = [column for column in SESSION_COLUMNS if column in fields]
+        if not columns:
+            return False
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE sessions SET {assignments} WHERE session_id = ?",
+                [fields[column] for column in columns] + [session_id]
+            )
+            return cursor.rowcount == 1
+
+    def touch_sessions(self, last_active_by_session):
+        with self.transaction() as conn:
+            conn.executemany(
+                "UPDATE sessions SET last_active = ? WHERE session_id = ?",
+                [(last_active, session_id) for session_id, last_active in last_active_by_session.items()]
+            )
+
+    def delete_session(self, session_id):
+        with self.transaction() as conn:
+            cursor = conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            return cursor.rowcount == 1
+
+    def delete_expired_sessions(self, now=None):
+        now = now or datetime.now().isoformat()
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,)).rowcount
+
+    # Stories
+    def get_story(self, story_id):
+        row = self._connection().execute(
+            "SELECT data FROM stories WHERE id = ?", (story_id,)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def get_stories(self, story_ids):
+        story_ids = list(dict.fromkeys(story_ids))
+        stories = {}
+        conn = self._connection()
+        # Stay under SQLite's bound parameter limit
+        for start in range(0, len(story_ids), 500):
+            chunk = story_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT id, data FROM stories WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for row in rows:
+                stories[row["id"]] = json.loads(row["data"])
+        return stories
+
+    def add_story(self, story):
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO stories (id, username, created_at, genre, status, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (story["id"], story.get("username", ""), story.get("created_at", ""),
+                 story.get("genre"), story.get("status"), json.dumps(story))
+            )
+            return cursor.rowcount == 1
+
+    def update_story(self, story_id, fields):
+        with self.transaction() as conn:
+            row = conn.execute("SELECT data FROM stories WHERE id = ?", (story_id,)).fetchone()
+            if row is None:
+                return None
+            story = json.loads(row["data"])
+            story.update(fields)
+            conn.execute(
+                "UPDATE stories SET username = ?, created_at = ?, genre = ?, status = ?, data = ? WHERE id = ?",
+                (story.get("username", ""), story.get("created_at", ""), story.get("genre"),
+                 story.get("status"), json.dumps(story), story_id)
+            )
+            return story
+
+    def iter_stories(self, batch_size=500):
+        last = ""
+        while True:
+            rows = self._connection().execute(
+                "SELECT id, data FROM stories WHERE id > ? ORDER BY id LIMIT ?", (last, batch_size)
+            ).fetchall()
+            for row in rows:
+                yield json.loads(row["data"])
+            if len(rows) < batch_size:
+                return
+            last = rows[-1]["id"]
+
+    def list_user_stories(self, username, limit=20, after=None, genre=None, status=None):
+        # Walks idx_stories_username_created backwards from the cursor
+        query = "SELECT data FROM stories WHERE username = ?"
+        params = [username]
+        if after:
+            created_at, story_id = decode_cursor(after)
+            query += " AND (created_at < ? OR (created_at = ? AND id < ?))"
+            params += [created_at, created_at, story_id]
+        if genre:
+            query += " AND genre = ? COLLATE NOCASE"
+            params.append(genre)
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._connection().execute(query, params).fetchall()
+        stories = [json.loads(row["data"]) for row in rows[:limit]]
+        next_cursor = encode_cursor(stories[-1]) if len(rows) > limit else None
+        return stories, next_cursor
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class JSONStorage(Storage):
+    """Legacy engine - one pretty-printed JSON document per collection
+    Stories are served by the story journal, which shares the stories.json layout
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.users_file = os.path.join(data_dir, "users.json")
+        self.email_index_file = os.path.join(data_dir, "email_index.json")
+        self.sessions_file = os.path.join(data_dir, "sessions.json")
+        # Serialise read-modify-write cycles across threads and worker processes
+        self._users_lock = FileLock(self.users_file + ".lock")
+        self._sessions_lock = FileLock(self.sessions_file + ".lock")
+
+        Path(data_dir).mkdir(parents=True, exist_ok=True)
+        for path, lock in ((self.users_file, self._users_lock), (self.sessions_file, self._sessions_lock)):
+            with lock:
+                if not os.path.exists(path):
+                    self._save(path, {})
+        self._email_index = {}
+        self._email_index_version = None
+        with self._users_lock:
+            self._load_email_index()
+
+    def _load_email_index(self):
+        """Load the persisted email index, rebuilding it if users.json is newer"""
+        if (os.path.exists(self.email_index_file)
+                and os.path.getmtime(self.email_index_file) >= os.path.getmtime(self.users_file)):
+            self._email_index = self._load(self.email_index_file)
+        else:
+            self._email_index = {}
+            for username, user in self._load(self.users_file).items():
+                self._email_index.setdefault(normalize_email(user.get("email", "")), username)
+            self._save(self.email_index_file, self._email_index)
+        self._email_index_version = self._file_version(self.email_index_file)
+
+    def _refresh_email_index(self):
+        """Reload the index if another worker process has rewritten it"""
+        if self._file_version(self.email_index_file) != self._email_index_version:
+            with self._users_lock:
+                self._load_email_index()
+
+    def _file_version(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, path):
+        return load_json_file(path)
+
+    def _save(self, path, records):
+        # Readers never take the lock, the rename guarantees they see a whole file
+        atomic_write_json(path, records, indent=2)
+
+    # Users
+    def get_user(self, username):
+        return self._load(self.users_file).get(username)
+
+    def add_user(self, user):
+        email = normalize_email(user["email"])
+        with self._users_lock:
+            self._refresh_email_index()
+            if email in self._email_index:
+                return EMAIL_TAKEN
+            users = self._load(self.users_file)
+            if user["username"] in users:
+                return USERNAME_TAKEN
+            users[user["username"]] = user
+            self._email_index[email] = user["username"]
+            # Users first: a crash in between leaves the index older, so it is rebuilt on load
+            self._save(self.users_file, users)
+            self._save(self.email_index_file, self._email_index)
+            self._email_index_version = self._file_version(self.email_index_file)
+            return USER_CREATED
+
+    def update_user(self, username, fields):
+        with self._users_lock:
+            self._refresh_email_index()
+            users = self._load(self.users_file)
+            if username not in users:
+                return False
+            old_email = normalize_email(users[username].get("email", ""))
+            users[username].update(fields)
+            self._save(self.users_file, users)
+            new_email = normalize_email(users[username].get("email", ""))
+            if new_email != old_email:
+                self._email_index.pop(old_email, None)
+                self._email_index[new_email] = username
+                self._save(self.email_index_file, self._email_index)
+                self._email_index_version = self._file_version(self.email_index_file)
+            return True
+
+    def get_username_by_email(self, email):
+        self._refresh_email_index()
+        return self._email_index.get(normalize_email(email))
+
+    def add_users(self, users):
+        # One load and one save for the whole batch instead of one per user
+        outcomes = []
+        with self._users_lock:
+            self._refresh_email_index()
+            records = self._load(self.users_file)
+            for user in users:
+                email = normalize_email(user["email"])
+                if user["username"] in records:
+                    outcomes.append(USERNAME_TAKEN)
+                elif email in self._email_index:
+                    outcomes.append(EMAIL_TAKEN)
+                else:
+                    records[user["username"]] = user
+                    self._email_index[email] = user["username"]
+                    outcomes.append(USER_CREATED)
+            if USER_CREATED in outcomes:
+                self._save(self.users_file, records)
+                self._save(self.email_index_file, self._email_index)
+                self._email_index_version = self._file_version(self.email_index_file)
+        return outcomes
+
+    def iter_users(self, batch_size=500):
+        # The legacy layout can only be read whole
+        yield from self._load(self.users_file).values()
+
+    # Sessions
+    def get_session(self, session_id):
+        return self._load(self.sessions_file).get(session_id)
+
+    def add_session(self, session_id, session):
+        with self._sessions_lock:
+            sessions = self._load(self.sessions_file)
+            sessions[session_id] = session
+            self._save(self.sessions_file, sessions)
+
+    def update_session(self, session_id, fields):
+        with self._sessions_lock:
+            sessions = self._load(self.sessions_file)
+            if session_id not in sessions:
+                return False
+            sessions[session_id].update(fields)
+            self._save(self.sessions_file, sessions)
+            return True
+
+    def touch_sessions(self, last_active_by_session):
+        with self._sessions_lock:
+            sessions = self._load(self.sessions_file)
+            for session_id, last_active in last_active_by_session.items():
+                if session_id in sessions:
+                    sessions[session_id]["last_active"] = last_active
+            self._save(self.sessions_file, sessions)
+
+    def delete_session(self, session_id):
+        with self._sessions_lock:
+            sessions = self._load(self.sessions_file)
+            if session_id not in sessions:
+                return False
+            del sessions[session_id]
+            self._save(self.sessions_file, sessions)
+            return True
+
+    def delete_expired_sessions(self, now=None):
+        now = now or datetime.now().isoformat()
+        with self._sessions_lock:
+            sessions = self._load(self.sessions_file)
+            expired = [sid for sid, s in sessions.items() if s["expires_at"] < now]
+            for session_id in expired:
+                del sessions[session_id]
+            if expired:
+                self._save(self.sessions_file, sessions)
+            return len(expired)
+
+
+def import_json_data(target, data_dir=DATA_DIR):
+    """One-shot import of the legacy users/sessions/stories JSON files"""
+    counts = {"users": 0, "sessions": 0, "stories": 0}
+    now = datetime.now().isoformat()
+
+    with target.transaction():
+        users = load_json_file(os.path.join(data_dir, "users.json"))
+        for username, user in users.items():
+            user.setdefault("username", username)
+            if target.add_user(user) == USER_CREATED:
+                counts["users"] += 1
+
+        sessions = load_json_file(os.path.join(data_dir, "sessions.json"))
+        for session_id, session in sessions.items():
+            # Dead sessions are dropped instead of being carried over
+            if session.get("expires_at", "") < now:
+                continue
+            target.add_session(session_id, session)
+            counts["sessions"] += 1
+
+        stories = load_json_file(os.path.join(data_dir, "stories.json"))
+        for story_id, story in stories.items():
+            story.setdefault("id", story_id)
+            if target.add_story(story):
+                counts["stories"] += 1
+
+    return counts
+
+
+def create_storage(engine=None, data_dir=DATA_DIR):
+    """Build the storage engine selected by DREAMSCAPE_STORAGE (sqlite or json)"""
+    engine = engine or os.environ.get("DREAMSCAPE_STORAGE", "sqlite")
+
+    if engine == "json":
+        return JSONStorage(data_dir)
+
+    if engine == "sqlite":
+        db_path = os.environ.get("DREAMSCAPE_DB_PATH", os.path.join(data_dir, "dreamscape.db"))
+        fresh = not os.path.exists(db_path)
+        sqlite_storage = SQLiteStorage(db_path)
+        if fresh:
+            # First start on this database: carry over the legacy JSON data
+            import_json_data(sqlite_storage, data_dir)
+        return sqlite_storage
+
+    raise ValueError(f"Unknown storage engine: {engine}")
+
+
+def create_story_store(main_storage, engine=None, data_dir=DATA_DIR):
+    """Pick the engine serving stories (DREAMSCAPE_STORY_STORE=storage or journal)"""
+    default = "journal" if isinstance(main_storage, JSONStorage) else "storage"
+    engine = engine or os.environ.get("DREAMSCAPE_STORY_STORE", default)
+
+    if engine == "storage":
+        return main_storage
+
+    if engine == "journal":
+        from stories.journal import StoryJournal
+        return StoryJournal(data_dir)
+
+    raise ValueError(f"Unknown story store: {engine}")
+
+
+# Global instances
+storage = create_storage()
+story_store = create_story_store(storage)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="DreamScape storage tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    import_parser = subcommands.add_parser("import", help="Import legacy JSON files into SQLite")
+    import_parser.add_argument("data_dir", nargs="?", default=DATA_DIR)
+    import_parser.add_argument("--db", default=None, help="SQLite database path")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        db_path = args.db or os.path.join(args.data_dir, "dreamscape.db")
+        result = import_json_data(SQLiteStorage(db_path), args.data_dir)
+        print(f"Imported {result['users']} users, {result['sessions']} sessions "
+              f"and {result['stories']} stories into {db_path}")
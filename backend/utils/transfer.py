@@ -0,0 +1,132 @@
+"""
+Streaming NDJSON export and import of stories and users
+Records are written one per line from storage iterators and read back in
+bounded batches, so memory use does not grow with the dataset
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+from utils.storage import USER_CREATED
+
+DEFAULT_BATCH_SIZE = 500
+# Per-line errors reported back to the caller, the rest are only counted
+MAX_REPORTED_ERRORS = 50
+
+STORY_FIELDS = ("id", "title", "genre", "mood", "idea", "username")
+USER_FIELDS = ("username", "email", "password_hash")
+
+
+def export_ndjson(records):
+    """Generator of NDJSON lines, suitable for a streamed HTTP response"""
+    for record in records:
+        yield json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def read_ndjson_batches(lines, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of (line_number, record, error) from an iterable of lines"""
+    batch = []
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            error = None if isinstance(record, dict) else "Record must be a JSON object"
+        except json.JSONDecodeError as e:
+            record, error = None, f"Invalid JSON: {e.msg}"
+        batch.append((line_number, record, error))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _missing_fields(record, fields):
+    missing = [field for field in fields if not record.get(field)]
+    return f"Missing fields: {', '.join(missing)}" if missing else None
+
+
+def _ingest(lines, batch_size, required_fields, key, write_batch):
+    summary = {"imported": 0, "duplicates": 0, "invalid": 0, "errors": []}
+
+    def report(line_number, error):
+        summary["invalid"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"line": line_number, "error": error})
+
+    for batch in read_ndjson_batches(lines, batch_size):
+        valid = []
+        seen = set()
+        for line_number, record, error in batch:
+            error = error or _missing_fields(record, required_fields)
+            if not error and not isinstance(record[key], str):
+                # Lookups are by string key, anything else could never be found again
+                error = f"{key} must be a string"
+            if error:
+                report(line_number, error)
+            elif record[key] in seen:
+                summary["duplicates"] += 1
+            else:
+                seen.add(record[key])
+                valid.append(record)
+        if valid:
+            imported, duplicates = write_batch(valid)
+            summary["imported"] += imported
+            summary["duplicates"] += duplicates
+    return summary
+
+
+def import_stories(store, lines, batch_size=DEFAULT_BATCH_SIZE):
+    """Validate and ingest NDJSON stories, skipping ids that already exist"""
+    def write_batch(stories):
+        for story in stories:
+            story.setdefault("created_at", datetime.now().isoformat())
+            story.setdefault("status", "in_progress")
+        results = store.add_stories(stories)
+        imported = sum(1 for inserted in results if inserted)
+        return imported, len(results) - imported
+
+    return _ingest(lines, batch_size, STORY_FIELDS, "id", write_batch)
+
+
+def import_users(storage, lines, batch_size=DEFAULT_BATCH_SIZE):
+    """Validate and ingest NDJSON users, skipping taken usernames and emails"""
+    def write_batch(users):
+        outcomes = storage.add_users(users)
+        imported = sum(1 for outcome in outcomes if outcome == USER_CREATED)
+        return imported, len(outcomes) - imported
+
+    return _ingest(lines, batch_size, USER_FIELDS, "username", write_batch)
+
+
+if __name__ == '__main__':
+    from utils.storage import storage, story_store
+
+    parser = argparse.ArgumentParser(description="Stream DreamScape data as NDJSON")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    for command in ("export", "import"):
+        sub = subcommands.add_parser(command)
+        sub.add_argument("collection", choices=["stories", "users"])
+        sub.add_argument("path", nargs="?", default="-", help="File path, '-' for stdin/stdout")
+        sub.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        records = story_store.iter_stories(args.batch_size) if args.collection == "stories" \
+            else storage.iter_users(args.batch_size)
+        out = sys.stdout if args.path == "-" else open(args.path, 'w', encoding='utf-8')
+        with out:
+            for line in export_ndjson(records):
+                out.write(line)
+    else:
+        source = sys.stdin if args.path == "-" else open(args.path, 'r', encoding='utf-8')
+        with source:
+            if args.collection == "stories":
+                result = import_stories(story_store, source, args.batch_size)
+            else:
+                result = import_users(storage, source, args.batch_size)
+        print(json.dumps(result, indent=2), file=sys.stderr)
@@ -0,0 +1,84 @@
+"""
+DreamScape production entry point
+Runs the Flask app under gunicorn with pre-forked, multi-threaded workers. The app,
+storage and agents are loaded once in the master before fork; writes to shared data
+go through file locks and atomic renames (see utils.filelock), and per-process caches
+rebuild their threads and locks after fork (see utils.fork).
+Falls back to waitress (threads only) where gunicorn is unavailable, e.g. on Windows.
+
+    python wsgi.py --workers 4 --threads 8
+    WEB_CONCURRENCY=4 gunicorn --preload --worker-class gthread --threads 8 wsgi:application
+
+Per-process pools (such as the password hash pool) size themselves from
+WEB_CONCURRENCY, which gunicorn also reads as its worker count; when starting
+gunicorn with --workers instead, set DREAMSCAPE_HASH_WORKERS explicitly.
+"""
+import argparse
+import multiprocessing
+import os
+
+# Worker processes must re-read cached sessions so a logout anywhere is seen everywhere
+os.environ.setdefault("DREAMSCAPE_SESSION_REVALIDATE", "5")
+
+os.makedirs(os.environ.get("DREAMSCAPE_DATA_DIR", "data"), exist_ok=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the DreamScape backend in production mode")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)))
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--timeout", type=int, default=60)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    # Known before the app is imported, so per-process pools split the machine between workers
+    args = parse_args()
+    try:
+        import gunicorn
+    except ImportError:
+        gunicorn = None
+    os.environ["WEB_CONCURRENCY"] = str(args.workers if gunicorn is not None else 1)
+
+from app import app
+
+application = app
+
+
+def run_gunicorn(host, port, workers, threads, timeout):
+    from gunicorn.app.base import BaseApplication
+
+    class DreamScapeApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", timeout)
+            # The app is already imported above, workers inherit it fork-for-fork
+            self.cfg.set("preload_app", True)
+
+        def load(self):
+            return application
+
+    DreamScapeApplication().run()
+
+
+def run_waitress(host, port, threads):
+    from waitress import serve
+    serve(application, host=host, port=port, threads=threads)
+
+
+if __name__ == '__main__':
+    print("🎬 Starting DreamScape Backend (production)...")
+    print(f"📡 Server: http://{args.host}:{args.port}")
+
+    if gunicorn is None:
+        print(f"⚠️ gunicorn not available, serving with waitress on {args.threads} threads (single process)")
+        run_waitress(args.host, args.port, args.threads)
+    else:
+        print(f"⚙️ {args.workers} workers x {args.threads} threads")
+        run_gunicorn(args.host, args.port, args.workers, args.threads, args.timeout)
@@ -0,0 +1,95 @@
+import os
+import uuid
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ---------------- Configuration ----------------
+BACKEND_URL = os.environ.get("DREAMSCAPE_BACKEND_URL", "http://localhost:5000").rstrip("/")
+STATUS_TTL = float(os.environ.get("DREAMSCAPE_STATUS_TTL", 10))
+READ_TTL = float(os.environ.get("DREAMSCAPE_READ_TTL", 30))
+
+# ---------------- Shared connection pool ----------------
+@st.cache_resource
+def get_session():
+    """One keep-alive session for every rerun and every browser session of this server"""
+    session = requests.Session()
+    # Only idempotent reads are retried automatically
+    retry = Retry(total=2, backoff_factor=0.2, allowed_methods=["GET"], status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=int(os.environ.get("DREAMSCAPE_BACKEND_POOL", 10)),
+                          max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _get(path, params=None, timeout=5):
+    return get_session().get(f"{BACKEND_URL}{path}", params=params, timeout=timeout).json()
+
+def _client_id():
+    """Identifies this browser session to the backend, which otherwise sees every visitor
+    as this one server (honoured when the backend sets DREAMSCAPE_CLIENT_HEADER)"""
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+    return st.session_state.client_id
+
+def _post(path, payload, timeout=10):
+    return get_session().post(f"{BACKEND_URL}{path}", json=payload, timeout=timeout,
+                              headers={"X-DreamScape-Client": _client_id()}).json()
+
+# ---------------- Cached reads ----------------
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def get_backend_status():
+    try:
+        return _get("/api/status")
+    except (requests.RequestException, ValueError):
+        return {"status": "offline", "message": "Backend not connected"}
+
+# Bounded so a long browsing session cannot keep the whole catalogue in memory
+@st.cache_data(ttl=READ_TTL, max_entries=200, show_spinner=False)
+def get_user_stories(username, limit=20, after=None, genre=None, status=None):
+    try:
+        return _get(f"/api/user/{username}/stories",
+                    params={"limit": limit, "after": after, "genre": genre, "status": status})
+    except (requests.RequestException, ValueError):
+        return {"success": False, "error": "Failed to load stories"}
+
+@st.cache_data(ttl=READ_TTL, max_entries=200, show_spinner=False)
+def get_story_analysis(story_id):
+    try:
+        return _get(f"/api/story/{story_id}/analysis")
+    except (requests.RequestException, ValueError):
+        return {"success": False, "error": "Failed to load analysis"}
+
+# ---------------- Writes ----------------
+def create_story(preferences):
+    try:
+        result = _post("/api/story/create", preferences)
+    except (requests.RequestException, ValueError):
+        return {"success": False, "error": "Failed to connect to backend server"}
+    if result.get("success"):
+        # The author's story list just changed
+        get_user_stories.clear()
+    return result
+
+# ---------------- Background analysis ----------------
+def submit_analysis(story_id, session_id=None):
+    """Queue an analysis job, returns immediately with its job_id
+    
+    With a session_id the work is charged to that user rather than this browser session
+    """
+    payload = {"story_id": story_id}
+    if session_id:
+        payload["session_id"] = session_id
+    try:
+        return _post("/api/story/analyze/jobs", payload)
+    except (requests.RequestException, ValueError):
+        return {"success": False, "error": "Failed to connect for analysis"}
+
+def get_job(job_id):
+    """Current job state, never cached since it is polled for changes"""
+    try:
+        return _get(f"/api/jobs/{job_id}")
+    except (requests.RequestException, ValueError):
+        # A missed poll is retried on the next refresh
+        return {"success": False, "error": "Backend did not answer the status check"}
@@ -1,38 +1,10 @@
 import streamlit as st
-import requests
 from streamlit_autorefresh import st_autorefresh
+from api_client import create_story, get_backend_status, get_job, submit_analysis
+from components import render_character, render_dialogue, render_plot, render_section, render_synthesis
 
-# ---------------- Backend status check ----------------
-def get_backend_status():
-    try:
-        response = requests.get("http://localhost:5000/api/status", timeout=5)
-        return response.json()
-    except:
-        return {"status": "offline", "message": "Backend not connected"}
-
-# ---------------- Create a story ----------------
-def create_story(preferences):
-    try:
-        response = requests.post(
-            "http://localhost:5000/api/story/create",
-            json=preferences,
-            timeout=10
-        )
-        return response.json()
-    except:
-        return {"success": False, "error": "Failed to connect to backend server"}
-
-# ---------------- Analyze a story ----------------
-def analyze_story(story_id):
-    try:
-        response = requests.post(
-            "http://localhost:5000/api/story/analyze",
-            json={"story_id": story_id},
-            timeout=10
-        )
-        return response.json()
-    except:
-        return {"success": False, "error": "Failed to connect for analysis"}
+# ---------------- Analysis polling ----------------
+POLL_INTERVAL_MS = 1000
 
 # ---------------- Streamlit UI ----------------
 st.set_page_config(page_title="DreamScape 🎬", layout="centered")
@@ -71,6 +43,7 @@ if st.button("🚀 Create My Story!", type="primary", use_container_width=True):
             story_id = result.get("story_id")
             st.session_state.story_id = story_id
             st.session_state.story_data = result.get("story")
+            st.session_state.pop("analysis_job_id", None)
             st.success(f"✨ Story created! ID: {story_id}")
             st.rerun()
         else:
@@ -84,59 +57,44 @@ if "story_id" in st.session_state:
     st.write(f"😊 **Mood:** {st.session_state.story_data.get('mood')}")
     st.write(f"👤 **Author:** {st.session_state.story_data.get('username')}")
 
+    job_id = st.session_state.get("analysis_job_id")
     if st.button("🧠 Analyze Story with AI Agents", type="primary", use_container_width=True):
-        with st.spinner("🤖 AI agents are analyzing your story..."):
-            analysis_result = analyze_story(st.session_state.story_id)
-
-            if analysis_result.get("success"):
+        # Queue the analysis and return at once, results are picked up by polling below
+        submitted = submit_analysis(st.session_state.story_id, st.session_state.get("session_id"))
+        if submitted.get("success"):
+            job_id = st.session_state.analysis_job_id = submitted["job_id"]
+        else:
+            st.error(f"Analysis failed: {submitted.get('error', 'Unknown error')}")
+
+    if job_id:
+        poll = get_job(job_id)
+        job = poll.get("job") if poll.get("success") else None
+
+        if job is None:
+            # Transient backend hiccup, keep polling instead of failing the analysis
+            st_autorefresh(interval=POLL_INTERVAL_MS, key=f"analysis_poll_{job_id}")
+            st.info(f"⏳ {poll.get('error', 'Waiting for the analysis status...')}")
+        elif job["status"] == "failed":
+            st.error(f"Analysis failed: {job.get('error') or 'Unknown error'}")
+        else:
+            finished = job["status"] == "completed"
+            if finished:
+                analysis = job.get("result") or {}
                 st.success("🎉 AI Analysis Complete!")
-
-                analysis = analysis_result.get("analysis", {})
-
-                # ---------------- Character Section ----------------
-                st.subheader("👤 Main Character")
-                char_dev = analysis["agent_contributions"]["character_development"]["main_character"]
-                st.write(f"**Archetype:** {char_dev['archetype']}")
-                st.write(f"**Background:** {char_dev['background']}")
-                st.write(f"**Character Arc:** {char_dev['character_arc']}")
-                st.write(f"**Motivation:** {char_dev['motivation']}")
-                st.write(f"**Personality Traits:** {', '.join(char_dev['personality_traits'])}")
-                st.write(f"**Strengths:** {', '.join(char_dev['strengths'])}")
-                st.write(f"**Weaknesses:** {', '.join(char_dev['weaknesses'])}")
-
-                # ---------------- Dialogue Section ----------------
-                st.subheader("💬 Dialogue Style")
-                dialogue = analysis["agent_contributions"]["dialogue_style"]
-                ds = dialogue["dialogue_style"]
-                st.write(f"**Rhythm:** {ds['rhythm']}")
-                st.write(f"**Tone:** {ds['tone']}")
-                st.write(f"**Vocabulary:** {ds['vocabulary']}")
-                st.write("**Guidelines:**")
-                for g in dialogue["guidelines"]:
-                    st.markdown(f"- {g}")
-                st.write(f"**Mood Adjustments:** {dialogue['mood_adjustments']}")
-
-                # ---------------- Plot Section ----------------
-                st.subheader("📖 Plot Analysis")
-                plot = analysis["agent_contributions"]["plot_analysis"]
-                st.write(f"**Analysis:** {plot['analysis']}")
-                st.write(f"**Confidence:** {plot['confidence'] * 100:.1f}%")
-                st.write(f"**Key Themes:** {', '.join(plot['key_themes'])}")
-                st.write(f"**Pacing Notes:** {plot['pacing_notes']}")
-                st.write("**Plot Suggestions:**")
-                for ps in plot["plot_suggestions"]:
-                    st.markdown(f"- {ps}")
-
-                # ---------------- Synthesis Section ----------------
-                st.subheader("📝 Synthesis")
-                synthesis = analysis["synthesis"]
-                st.write("**Integration Notes:**")
-                for note in synthesis["integration_notes"]:
-                    st.markdown(f"- {note}")
-
-                st.write("**Story Structure:**")
-                for step in synthesis["story_structure"]:
-                    st.markdown(f"- {step}")
-
             else:
-                st.error(f"Analysis failed: {analysis_result.get('error', 'Unknown error')}")
+                st_autorefresh(interval=POLL_INTERVAL_MS, key=f"analysis_poll_{job_id}")
+                analysis = job.get("progress") or {}
+                done = len(analysis.get("agent_contributions", {}))
+                total = analysis.get("total", 3)
+                st.progress(done / total if total else 0.0,
+                            text=f"🤖 AI agents are analyzing your story... {done}/{total}")
+
+            contributions = analysis.get("agent_contributions", {})
+            render_section("👤 Main Character", contributions.get("character_development"),
+                           render_character, "⏳ CharacterAgent is working...")
+            render_section("💬 Dialogue Style", contributions.get("dialogue_style"),
+                           render_dialogue, "⏳ DialogueAgent is working...")
+            render_section("📖 Plot Analysis", contributions.get("plot_analysis"),
+                           render_plot, "⏳ PlotAgent is working...")
+            render_section("📝 Synthesis", analysis.get("synthesis") if finished else None,
+                           render_synthesis, "⏳ Waiting for every agent before combining their ideas...")
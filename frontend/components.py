@@ -0,0 +1,59 @@
+import streamlit as st
+
+# ---------------- Degraded agent output ----------------
+def agent_unavailable(contribution):
+    return contribution.get("status") in ("timed_out", "failed")
+
+def show_agent_unavailable(contribution):
+    if contribution.get("status") == "timed_out":
+        st.warning(f"⏱️ {contribution.get('agent')} did not answer in time")
+    else:
+        st.warning(f"⚠️ {contribution.get('agent')} failed: {contribution.get('error', 'Unknown error')}")
+
+# ---------------- Analysis sections ----------------
+def render_section(heading, contribution, render, waiting_message):
+    st.subheader(heading)
+    if contribution is None:
+        st.info(waiting_message)
+    elif agent_unavailable(contribution):
+        show_agent_unavailable(contribution)
+    else:
+        render(contribution)
+
+def render_character(contribution):
+    char_dev = contribution["main_character"]
+    st.write(f"**Archetype:** {char_dev['archetype']}")
+    st.write(f"**Background:** {char_dev['background']}")
+    st.write(f"**Character Arc:** {char_dev['character_arc']}")
+    st.write(f"**Motivation:** {char_dev['motivation']}")
+    st.write(f"**Personality Traits:** {', '.join(char_dev['personality_traits'])}")
+    st.write(f"**Strengths:** {', '.join(char_dev['strengths'])}")
+    st.write(f"**Weaknesses:** {', '.join(char_dev['weaknesses'])}")
+
+def render_dialogue(dialogue):
+    ds = dialogue["dialogue_style"]
+    st.write(f"**Rhythm:** {ds['rhythm']}")
+    st.write(f"**Tone:** {ds['tone']}")
+    st.write(f"**Vocabulary:** {ds['vocabulary']}")
+    st.write("**Guidelines:**")
+    for g in dialogue["guidelines"]:
+        st.markdown(f"- {g}")
+    st.write(f"**Mood Adjustments:** {dialogue['mood_adjustments']}")
+
+def render_plot(plot):
+    st.write(f"**Analysis:** {plot['analysis']}")
+    st.write(f"**Confidence:** {plot['confidence'] * 100:.1f}%")
+    st.write(f"**Key Themes:** {', '.join(plot['key_themes'])}")
+    st.write(f"**Pacing Notes:** {plot['pacing_notes']}")
+    st.write("**Plot Suggestions:**")
+    for ps in plot["plot_suggestions"]:
+        st.markdown(f"- {ps}")
+
+def render_synthesis(synthesis):
+    st.write("**Integration Notes:**")
+    for note in synthesis["integration_notes"]:
+        st.markdown(f"- {note}")
+
+    st.write("**Story Structure:**")
+    for step in synthesis["story_structure"]:
+        st.markdown(f"- {step}")
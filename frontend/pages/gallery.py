@@ -0,0 +1,84 @@
+import streamlit as st
+from api_client import get_story_analysis, get_user_stories
+from components import agent_unavailable, render_character, render_dialogue, render_plot, render_section, \
+    show_agent_unavailable
+
+PAGE_SIZE = 12
+
+# Renderers for the round 1 contributions, later rounds are shown as raw data
+SECTIONS = {
+    "character_development": ("👤 Main Character", render_character),
+    "dialogue_style": ("💬 Dialogue Style", render_dialogue),
+    "plot_analysis": ("📖 Plot Analysis", render_plot)
+}
+
+# ---------------- Lazy analysis ----------------
+def show_analysis(story_id):
+    """Fetched only once the reader asks for it"""
+    result = get_story_analysis(story_id)
+    if not result.get("success"):
+        st.error(result.get("error", "Failed to load analysis"))
+        return
+
+    contributions = result.get("contributions", {})
+    if not contributions:
+        st.info("🤖 This story has not been analyzed yet.")
+        return
+
+    stale = set(result.get("stale_contributions", []))
+    for key, entry in contributions.items():
+        value = entry["value"]
+        if key in SECTIONS:
+            heading, render = SECTIONS[key]
+            render_section(heading, value, render, "")
+        else:
+            st.subheader(key.replace("_", " ").title())
+            if agent_unavailable(value):
+                show_agent_unavailable(value)
+            else:
+                st.json(value, expanded=False)
+        if key in stale:
+            st.caption("♻️ The story changed since this was written, analyze it again to refresh")
+
+# ---------------- Gallery UI ----------------
+st.set_page_config(page_title="DreamScape Gallery 🎬", layout="centered")
+st.title("🖼️ Story Gallery")
+
+default_user = st.session_state.get("story_data", {}).get("username", "guest_user")
+col_user, col_genre = st.columns(2)
+username = col_user.text_input("👤 Username", default_user)
+genre = col_genre.selectbox("🎭 Genre", ["All", "Action", "Comedy", "Drama", "Horror", "Fantasy", "Sci-Fi"])
+genre = None if genre == "All" else genre
+
+# Only page cursors live in the session, the pages themselves come from the TTL cache
+gallery_key = (username, genre)
+if st.session_state.get("gallery_key") != gallery_key:
+    st.session_state.gallery_key = gallery_key
+    st.session_state.gallery_cursors = [None]
+
+next_cursor = None
+shown = 0
+for cursor in st.session_state.gallery_cursors:
+    page = get_user_stories(username, limit=PAGE_SIZE, after=cursor, genre=genre)
+    if not page.get("success"):
+        st.error(page.get("error", "Failed to load stories"))
+        break
+
+    for story in page.get("stories", []):
+        shown += 1
+        with st.expander(f"📖 {story['title']} · {story['genre']} · {story['mood']}"):
+            st.write(f"💡 {story['idea']}")
+            st.caption(f"Created {story.get('created_at', '')[:16].replace('T', ' ')} · {story.get('status', '')}")
+            # Analysis is only requested for cards the reader opens
+            if st.toggle("🧠 Show AI analysis", key=f"gallery_analysis_{story['id']}"):
+                show_analysis(story["id"])
+    next_cursor = page.get("next_cursor")
+
+if shown == 0:
+    st.info("No stories yet. Create one on the main page!")
+elif next_cursor:
+    if st.button("⬇️ Load more stories", use_container_width=True):
+        st.session_state.gallery_cursors.append(next_cursor)
+        st.rerun()
+else:
+    st.caption(f"That's all {shown} stories.")